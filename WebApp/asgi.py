@@ -0,0 +1,106 @@
+import asyncio
+
+import uvicorn
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Mount, Route, WebSocketRoute
+from starlette.websockets import WebSocketDisconnect
+
+import back
+import voice_pipeline
+
+# ASGI entry point: /voice and /voice/ws run on the async pipeline, every
+# other route is served by the Flask app. Run with `uvicorn asgi:app --workers N`.
+
+
+async def voice(request):
+    form = await request.form()
+    upload = form["audio"]
+    audio = await upload.read()
+    stream = form.get("stream") == "1"
+    handle = voice_pipeline.handle_voice_stream if stream else voice_pipeline.handle_voice
+    try:
+        speech = await handle(
+            audio,
+            upload.filename or "recording.webm",
+            form.get("page_text", ""),
+            form.get("gen_z_mode", "normal"),
+        )
+    except Exception as e:
+        print(f"Error in voice pipeline: {e}")
+        return JSONResponse({"error": str(e)}, status_code=502)
+    if stream:
+        return StreamingResponse(speech, media_type="audio/mpeg")
+    return Response(speech, media_type="audio/mpeg")
+
+
+# Streaming voice session. The client sends a JSON message with page_text and
+# gen_z_mode, then binary audio frames while recording, then "stop". Frames
+# are forwarded to transcription as they arrive; the reply comes back as
+# binary MP3 chunks followed by a JSON {"done": true} or {"error": ...}.
+# At most MAX_PENDING_FRAMES frames wait for the upload; if transcription
+# ends before the recording does (the upload failed), the session ends with
+# its error instead of queueing frames nobody reads.
+MAX_PENDING_FRAMES = 64
+
+
+async def voice_socket(websocket):
+    await websocket.accept()
+    options = await websocket.receive_json()
+    frames = asyncio.Queue(MAX_PENDING_FRAMES)
+
+    async def audio_frames():
+        while (frame := await frames.get()) is not None:
+            yield frame
+
+    transcription = asyncio.create_task(voice_pipeline.transcribe_stream(audio_frames()))
+
+    async def forward(frame):
+        put = asyncio.ensure_future(frames.put(frame))
+        await asyncio.wait({put, transcription}, return_when=asyncio.FIRST_COMPLETED)
+        # The final None may be read, and the transcript done, at once
+        if not put.done() or (frame is not None and transcription.done()):
+            put.cancel()
+            transcription.result()
+            raise RuntimeError("transcription ended before the recording")
+
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+            if message.get("bytes"):
+                await forward(message["bytes"])
+            elif message.get("text") == "stop":
+                await forward(None)
+                break
+
+        command = await transcription
+        speech = await voice_pipeline.speak_stream(
+            command, options.get("page_text", ""), options.get("gen_z_mode", "normal")
+        )
+        async for audio in speech:
+            await websocket.send_bytes(audio)
+        await websocket.send_json({"done": True})
+    except WebSocketDisconnect:
+        transcription.cancel()
+        return
+    except Exception as e:
+        print(f"Error in voice pipeline: {e}")
+        transcription.cancel()
+        await websocket.send_json({"error": str(e)})
+    await websocket.close()
+
+
+app = Starlette(
+    routes=[
+        Route("/voice", voice, methods=["POST"]),
+        WebSocketRoute("/voice/ws", voice_socket),
+        Mount("/", WSGIMiddleware(back.app)),
+    ]
+)
+
+
+if __name__ == "__main__":
+    uvicorn.run(app, host="0.0.0.0", port=8078)
@@ -1,131 +1,176 @@
 import os
-import re
-import requests
+import tempfile
+import threading
+from functools import lru_cache
 import speech_recognition as sr
 import pyttsx3
-import pandas as pd
-from openai import OpenAI
-import spacy
-from fuzzywuzzy import process
 from playsound import playsound
+from intents import detect_intent
+from lazy import Lazy
+from quotes import QuoteService, fetch_global_quote
+from tickers import ALPHA_VANTAGE_API_KEY, get_ticker_from_alphavantage
+from stt import get_transcriber
+from spliced import TemplateReply, speech_sentences, splice, template_fragments
+from tts_cache import SpeechCache, cached_speech, warm_up
+from tts_stream import iter_sentences, split_sentences, stream_speech
 
 CSV_FILE = r"C:\Users\ararm\Desktop\CDTM\voice-trading-bot\data\trading_sample_data_with_company.csv"
 
 # Configuration
 CSV_FILE = r"tradeFiltered.csv"
-ALPHA_VANTAGE_API_KEY = ""
-openai_client = OpenAI(
-    api_key=""
+OPENAI_API_KEY = ""
+TTS_MODEL = "tts-1"
+TTS_VOICE = "shimmer"
+NOT_UNDERSTOOD = "Sorry, I didn't understand. Please try again."
+GOODBYE = "Thank you for using our Enhanced Trading Assistant. Goodbye!"
+
+# Data reply templates. Their constant fragments are synthesized ahead of
+# time and only the slots are spoken fresh (see spliced.py).
+STOCK_PRICE = "The current stock price of {company} is {price:.2f} dollars."
+NO_PRICE = "Sorry, I couldn't retrieve the stock price for {company}."
+NO_TICKER = "Sorry, I couldn't find the stock ticker for {company}."
+TRANSACTION_COUNT = "There are {count} transactions for {company}."
+TOTAL_VALUE = "The total transaction value for {company} is {value:.2f}."
+AVERAGE_VALUE = "The average transaction value for {company} is {avg:.2f}."
+TOP_COMPANY = "The company with the most transactions is {top}."
+LAST_TRANSACTION = "The last transaction for {company} was on {date} for {price}."
+FIRST_TRANSACTION = "The first transaction for {company} was on {date} for {price}."
+COMPANY_LIST = "I found {count} companies: {names}..."
+TRANSACTION_TYPES = "Transaction types include: {types}."
+TEMPLATES = [
+    STOCK_PRICE,
+    NO_PRICE,
+    NO_TICKER,
+    TRANSACTION_COUNT,
+    TOTAL_VALUE,
+    AVERAGE_VALUE,
+    TOP_COMPANY,
+    LAST_TRANSACTION,
+    FIRST_TRANSACTION,
+    COMPANY_LIST,
+    TRANSACTION_TYPES,
+]
+# Only named entities are used. The ner component of en_core_web_sm carries
+# its own tok2vec, so the shared tok2vec and everything feeding the parser
+# and lemmatizer can be skipped.
+NER_DISABLED = ["tok2vec", "tagger", "parser", "attribute_ruler", "lemmatizer"]
+
+
+# Clients, data and models are created on first use (see lazy.py); the
+# heavy imports happen there too
+def create_openai_client():
+    from openai import OpenAI
+
+    return OpenAI(api_key=OPENAI_API_KEY)
+
+
+def load_trades():
+    import ingest
+
+    return ingest.load(CSV_FILE)
+
+
+def build_company_index():
+    from company_index import CompanyIndex
+
+    return CompanyIndex(df.get())
+
+
+def load_nlp():
+    import spacy
+
+    return spacy.load("en_core_web_sm", disable=NER_DISABLED)
+
+
+openai_client = Lazy(create_openai_client, "openai", client=True)
+recognizer = Lazy(sr.Recognizer)
+engine = Lazy(pyttsx3.init)
+df = Lazy(load_trades, "trades")
+company_index = Lazy(build_company_index, "company_index")
+nlp = Lazy(load_nlp, "nlp")
+quote_service = QuoteService(
+    lambda ticker_symbol: fetch_global_quote(ticker_symbol, ALPHA_VANTAGE_API_KEY)
 )
-recognizer = sr.Recognizer()
-engine = pyttsx3.init()
-
-# Load data and model
-df = pd.read_csv(CSV_FILE)
-nlp = spacy.load("en_core_web_sm")
-
-
-# Function to search for ticker symbol using Alpha Vantage's SYMBOL_SEARCH API
-def get_ticker_from_alphavantage(company_name):
-    try:
-        url = f"https://www.alphavantage.co/query?function=SYMBOL_SEARCH&keywords={company_name}&apikey={ALPHA_VANTAGE_API_KEY}"
-        response = requests.get(url)
-        data = response.json()
-
-        # Log the full response for debugging
-        print(f"Full response for {company_name}: {data}")
-
-        if "bestMatches" in data:
-            # Iterate through the best matches to find the correct symbol
-            for match in data["bestMatches"]:
-                ticker = match.get("1. symbol")
-                company = match.get("2. name")
-                exchange = match.get("4. region", "").lower()
-
-                # Check if the region is the US and select the first US match
-                if "united states" in exchange:
-                    print(
-                        f"Ticker symbol found: {ticker} for company: {company} on exchange: {exchange}"
-                    )
-                    return ticker
-
-            # If no valid ticker is found in the US region, log and return None
-            print(
-                f"Error: No valid ticker symbol found for {company_name} in the US region."
-            )
-            return None
-        else:
-            print(f"Error: Could not retrieve ticker for {company_name}")
-            return None
-    except Exception as e:
-        print(f"Error fetching ticker symbol from Alpha Vantage: {e}")
-        return None
+speech_cache = SpeechCache()
 
 
 # Get real-time stock price from Alpha Vantage
 def get_real_time_stock_price(ticker_symbol):
     try:
-        url = f"https://www.alphavantage.co/query?function=TIME_SERIES_INTRADAY&symbol={ticker_symbol}&interval=5min&apikey={ALPHA_VANTAGE_API_KEY}"
-        response = requests.get(url)
-        data = response.json()
-
-        if "Time Series (5min)" in data:
-            latest_time = list(data["Time Series (5min)"].keys())[0]
-            latest_close_price = data["Time Series (5min)"][latest_time]["4. close"]
-            print(f"Latest stock price for {ticker_symbol}: {latest_close_price}")
-            return float(latest_close_price)
-        else:
-            print(f"Error fetching stock price for {ticker_symbol}: {data}")
+        price = quote_service.get(ticker_symbol)
+        if price is None:
+            print(f"Error fetching stock price for {ticker_symbol}: no quote")
             return None
+        print(f"Latest stock price for {ticker_symbol}: {price}")
+        return price
     except Exception as e:
         print(f"Error fetching real-time stock price for {ticker_symbol}: {e}")
         return None
 
 
-# Text to speech function
+# Play MP3 bytes locally; playsound needs a file path
+def play_audio(audio):
+    with tempfile.NamedTemporaryFile(suffix=".mp3", delete=False) as f:
+        f.write(audio)
+    try:
+        playsound(f.name)
+    finally:
+        os.remove(f.name)
+
+
+def remote_synthesize(text):
+    speech_response = openai_client.get().audio.speech.create(
+        model=TTS_MODEL, voice=TTS_VOICE, input=text
+    )
+    return speech_response.content
+
+
+def synthesize(text):
+    if isinstance(text, TemplateReply):
+        return splice(text, synthesize)
+    return cached_speech(speech_cache, text, TTS_VOICE, TTS_MODEL, remote_synthesize)
+
+
+# Text to speech function, returns the synthesized MP3 bytes
 def text_to_voice(text):
     try:
         print(text)
 
-        speech_response = openai_client.audio.speech.create(
-            model="tts-1", voice="shimmer", input=text
-        )
-
-        # Save to temporary file
-        with open("output.mp3", "wb") as f:
-            f.write(speech_response.content)
+        audio = synthesize(text)
         if __name__ == "__main__":
-            # engine.say(text)
-            playsound("output.mp3")
-        else:
-            # engine.save_to_file(text,"output.mp3")
-            pass
-        # engine.runAndWait()
+            play_audio(audio)
+        return audio
     except Exception as e:
         print(f"Error in text_to_voice: {e}")
+        return b""
     finally:
-        engine.stop()
+        # Nothing here speaks through pyttsx3, so don't start it just to stop it
+        if engine.ready:
+            engine.get().stop()
+
+
+# Streaming text to speech: yields MP3 data sentence by sentence
+def text_to_voice_stream(sentences):
+    return stream_speech(sentences, synthesize)
 
 
 def audio_file_to_text(path):
-    # Transcribe using OpenAI Whisper
+    # Transcribe with the configured STT backend (Whisper API or local model)
     with open(path, "rb") as f:
-        transcript = openai_client.audio.transcriptions.create(
-            model="whisper-1", file=f
-        ).text
-    return transcript
+        audio = f.read()
+    return get_transcriber(openai_client.get()).transcribe(audio, os.path.basename(path))
 
 
 # Speech recognition function
 def voice_to_text():
     with sr.Microphone() as source:
         print("Listening for command...")
-        recognizer.adjust_for_ambient_noise(source)
-        audio = recognizer.listen(source)
+        recognizer.get().adjust_for_ambient_noise(source)
+        audio = recognizer.get().listen(source)
 
     try:
         print("Recognizing command...")
-        text = recognizer.recognize_google(audio).lower()
+        text = recognizer.get().recognize_google(audio).lower()
         print(f"User said: {text}")
         return text
     except sr.UnknownValueError:
@@ -136,152 +181,79 @@ def voice_to_text():
         return ""
 
 
+# Organisations spaCy finds in a command, parsed once per utterance
+@lru_cache(maxsize=256)
+def extract_organizations(command):
+    return tuple(ent.text for ent in nlp.get()(command).ents if ent.label_ == "ORG")
+
+
 # Extract company using spaCy and fuzzy matching
 def extract_entities(command):
-    doc = nlp(command)
+    organizations = extract_organizations(command)
 
     # Try to extract company name using spaCy
-    for ent in doc.ents:
-        if ent.label_ == "ORG":
-            print(f"Company name extracted: {ent.text}")
-            company_name = ent.text.lower()
-
-            # Fuzzy match the extracted name to the CSV file
-            best_match = process.extractOne(
-                company_name, df["CompanyName"].str.lower().tolist()
-            )
-            if best_match and best_match[1] > 80:  # Match threshold can be adjusted
-                matched_company = best_match[0]
-                print(f"Best matched company: {matched_company}")
-                return matched_company
+    for organization in organizations:
+        print(f"Company name extracted: {organization}")
+        company_name = organization.lower()
+
+        # Fuzzy match the extracted name to the CSV file
+        best_match = company_index.get().fuzzy_match(company_name)
+        if best_match and best_match[1] > 80:  # Match threshold can be adjusted
+            matched_company = best_match[0]
+            print(f"Best matched company: {matched_company}")
+            return matched_company
 
     # If no company was detected by spaCy, fallback to direct fuzzy matching
     company_name = command.lower()
-    best_match = process.extractOne(
-        company_name, df["CompanyName"].str.lower().tolist()
-    )
+    best_match = company_index.get().fuzzy_match(company_name)
     if best_match and best_match[1] > 80:  # Match threshold can be adjusted
         matched_company = best_match[0]
         print(f"Best matched company: {matched_company}")
         return matched_company
 
-    # If no match found in CSV, try using spaCy again without fuzzy matching for external stock lookup
-    doc = nlp(command)
-    for ent in doc.ents:
-        if ent.label_ == "ORG":
-            return ent.text
+    # If no match found in CSV, use spaCy's organisation as is for external stock lookup
+    if organizations:
+        return organizations[0]
 
     # If no match found at all, return empty
     return ""
 
 
-SYNONYMS = {
-    "price": ["price", "cost", "worth", "value"],
-    "stock": ["stock", "share"],
-    "transaction": ["transaction", "txn", "deal", "operation"],
-    "company": ["company", "business", "firm"],
-    "list": ["list", "show", "display"],
-    "average": ["average", "mean"],
-    "total": ["total", "sum"],
-    "exit": ["exit", "stop", "quit", "leave"],
-    "help": ["help", "assist", "support"],
-}
-
-
-def expand_pattern(pattern):
-    expanded = []
-    for word in pattern:
-        expanded.append(SYNONYMS.get(word, [word]))
-    return expanded
-
-
-# Patterns use keywords, not synonyms directly
-INTENT_PATTERNS = {
-    "stock_price": [
-        ["stock", "price"],
-        ["how", "much", "stock", "cost"],
-        ["how", "much", "is", "stock"],
-        ["how", "much", "is", "the", "stock"],
-    ],
-    "top_company": [["most", "transactions"], ["top", "company"]],
-    "last_transaction": [["last", "transaction"]],
-    "first_transaction": [["first", "transaction"]],
-    "transaction_count": [["how", "many"], ["number", "transactions"]],
-    "total_value": [["total", "value"], ["total", "worth"]],
-    "average_value": [["average", "value"], ["average", "transaction"]],
-    "list_companies": [["list", "companies"], ["show", "companies"]],
-    "transaction_types": [["transaction", "types"], ["types", "of", "transactions"]],
-    "help": [["help"], ["what", "can", "you", "do"]],
-    "exit": [["stop"], ["exit"], ["enough"]],
-}
-
-
-def preprocess_command(command):
-    command = command.lower()
-    command = re.sub(r"[^\w\s]", "", command)
-    return command.split()
-
-
-# Intent detection - combine both systems
-def match_pattern(command_words, pattern):
-    # Expand pattern with synonyms
-    expanded = expand_pattern(pattern)
-    for synonym_group in expanded:
-        if not any(word in command_words for word in synonym_group):
-            return False
-    return True
-
-
-def detect_intent(command):
-    command_words = preprocess_command(command)
-
-    for intent, patterns in INTENT_PATTERNS.items():
-        for pattern in patterns:
-            if match_pattern(command_words, pattern):
-                return intent
-
-    return "unknown"
-
-
 # Transaction data functions
 def get_transaction_count(company):
-    filtered = df[df["CompanyName"].str.lower().str.contains(company.lower(), na=False)]
-    return len(filtered)
+    return company_index.get().count(company)
 
 
 def get_total_value(company):
-    filtered = df[df["CompanyName"].str.lower().str.contains(company.lower(), na=False)]
-    return filtered["executionPrice"].sum()
+    return company_index.get().total(company)
 
 
 def get_average_value(company):
-    filtered = df[df["CompanyName"].str.lower().str.contains(company.lower(), na=False)]
-    return filtered["executionPrice"].mean()
+    return company_index.get().mean(company)
 
 
 def get_top_company():
-    return df["CompanyName"].value_counts().idxmax()
+    return df.get()["CompanyName"].value_counts().idxmax()
 
 
 def get_first_transaction(company):
-    filtered = df[df["CompanyName"].str.lower().str.contains(company.lower(), na=False)]
-    return filtered.sort_values(by="executedAt").head(1)
+    return company_index.get().first_transaction(company)
 
 
 def get_last_transaction(company):
-    filtered = df[df["CompanyName"].str.lower().str.contains(company.lower(), na=False)]
-    return filtered.sort_values(by="executedAt", ascending=False).head(1)
+    return company_index.get().last_transaction(company)
 
 
 def list_all_companies():
-    return df["CompanyName"].dropna().unique()
+    return df.get()["CompanyName"].dropna().unique()
 
 
 def get_transaction_types():
-    if "transactionType" in df.columns:
-        return df["transactionType"].unique()
-    elif "type" in df.columns:
-        return df["type"].unique()
+    trades = df.get()
+    if "transactionType" in trades.columns:
+        return trades["transactionType"].unique()
+    elif "type" in trades.columns:
+        return trades["type"].unique()
     return ["Transaction type column not found"]
 
 
@@ -299,7 +271,7 @@ def print_help():
     )
 
 
-def normal_inference(text, context, mode):
+def system_prompt(context, mode):
     if "u" in mode: # I hate JavaScript
         content = f"""
 You're the unhinged but genius voice of Grindrich — the most chaotic finance assistant this side of Wall Street Bets. 
@@ -330,8 +302,30 @@ Only reply with short, spoken-style responses.
 You are not allowed to give financial advice.
 YOU ARE THE PROFFESUONAL ABSOLUTELY NO JOKES
 """
+    return content
+
+
+def chat_reply(text, context, mode):
+    content = system_prompt(context, mode)
+    print(content,mode)
+    chat = openai_client.get().chat.completions.create(
+        model="gpt-3.5-turbo",
+        messages=[
+            {"role": "system", "content": content},
+            {"role": "user", "content": text},
+        ],
+        temperature=0.7,
+        max_tokens=150,
+    )
+
+    return chat.choices[0].message.content.strip()
+
+
+# Streamed completion: yields the reply text piece by piece as it is generated
+def chat_reply_stream(text, context, mode):
+    content = system_prompt(context, mode)
     print(content,mode)
-    chat = openai_client.chat.completions.create(
+    stream = openai_client.get().chat.completions.create(
         model="gpt-3.5-turbo",
         messages=[
             {"role": "system", "content": content},
@@ -339,27 +333,68 @@ YOU ARE THE PROFFESUONAL ABSOLUTELY NO JOKES
         ],
         temperature=0.7,
         max_tokens=150,
+        stream=True,
     )
+    for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
 
-    response_text = chat.choices[0].message.content.strip()
-    text_to_voice(response_text)
 
+def normal_inference(text, context, mode):
+    return text_to_voice(chat_reply(text, context, mode))
+
+
+# Text reply for a transcribed command, from the trading data or the chat model
+def reply_for(command, context, mode):
+    if not command:
+        return NOT_UNDERSTOOD
+    reply = answer_command(command)
+    if reply is None:
+        reply = chat_reply(command, context, mode)
+    return reply
 
+
+# Handle one spoken command and return the reply as MP3 bytes
 def interact_once(path=None, context="", mode=False):
     if __name__ == "__main__":
         command = voice_to_text()
     else:
         command = audio_file_to_text(path)
+    return text_to_voice(reply_for(command, context, mode))
+
+
+# Reply for a transcribed command as a stream of sentences. Chat model replies
+# are cut into sentences while tokens are still arriving.
+def reply_sentences(command, context, mode):
     if not command:
-        text_to_voice("Sorry, I didn't understand. Please try again.")
-        return
+        return [NOT_UNDERSTOOD]
+    reply = answer_command(command)
+    if reply is None:
+        return iter_sentences(chat_reply_stream(command, context, mode))
+    return speech_sentences(reply)
+
 
+def logged(sentences):
+    for sentence in sentences:
+        print(sentence)
+        yield sentence
+
+
+# Like interact_once, but returns a generator of MP3 chunks so the reply can
+# be sent while later sentences are still being generated and synthesized
+def interact_stream(path, context="", mode=False):
+    command = audio_file_to_text(path)
+    return text_to_voice_stream(logged(reply_sentences(command, context, mode)))
+
+
+# Answer a transcribed command from the trading data. Returns None when the
+# intent is unknown and the command should go to the chat model instead.
+def answer_command(command):
     intent = detect_intent(command)
     print(f"Intent Detected: {intent}")  # Debugging statement
 
     if intent == "exit":
-        text_to_voice("Thank you for using our Enhanced Trading Assistant. Goodbye!")
-        return
+        return GOODBYE
 
     elif intent == "stock_price":
         company = extract_entities(command)
@@ -368,45 +403,41 @@ def interact_once(path=None, context="", mode=False):
             if ticker_symbol:
                 price = get_real_time_stock_price(ticker_symbol)
                 if price:
-                    text_to_voice(
-                        f"The current stock price of {company} is {price:.2f} dollars."
-                    )
+                    return TemplateReply(STOCK_PRICE, company=company, price=price)
                 else:
-                    text_to_voice(
-                        f"Sorry, I couldn't retrieve the stock price for {company}."
-                    )
+                    return TemplateReply(NO_PRICE, company=company)
             else:
-                text_to_voice(f"Sorry, I couldn't find the stock ticker for {company}.")
+                return TemplateReply(NO_TICKER, company=company)
         else:
-            text_to_voice("I couldn't detect a company name.")
+            return "I couldn't detect a company name."
 
     elif intent == "transaction_count":
         company = extract_entities(command)
         if company:
             count = get_transaction_count(company)
-            text_to_voice(f"There are {count} transactions for {company}.")
+            return TemplateReply(TRANSACTION_COUNT, count=count, company=company)
         else:
-            text_to_voice("I couldn't detect a company name.")
+            return "I couldn't detect a company name."
 
     elif intent == "total_value":
         company = extract_entities(command)
         if company:
             value = get_total_value(company)
-            text_to_voice(f"The total transaction value for {company} is {value:.2f}.")
+            return TemplateReply(TOTAL_VALUE, company=company, value=value)
         else:
-            text_to_voice("Company name not found.")
+            return "Company name not found."
 
     elif intent == "average_value":
         company = extract_entities(command)
         if company:
             avg = get_average_value(company)
-            text_to_voice(f"The average transaction value for {company} is {avg:.2f}.")
+            return TemplateReply(AVERAGE_VALUE, company=company, avg=avg)
         else:
-            text_to_voice("Company name not found.")
+            return "Company name not found."
 
     elif intent == "top_company":
         top = get_top_company()
-        text_to_voice(f"The company with the most transactions is {top}.")
+        return TemplateReply(TOP_COMPANY, top=top)
 
     elif intent == "last_transaction":
         company = extract_entities(command)
@@ -414,13 +445,16 @@ def interact_once(path=None, context="", mode=False):
             result = get_last_transaction(company)
             if not result.empty:
                 row = result.iloc[0]
-                text_to_voice(
-                    f"The last transaction for {company} was on {row['executedAt']} for {row['executionPrice']}."
+                return TemplateReply(
+                    LAST_TRANSACTION,
+                    company=company,
+                    date=row["executedAt"],
+                    price=row["executionPrice"],
                 )
             else:
-                text_to_voice("No transactions found.")
+                return "No transactions found."
         else:
-            text_to_voice("Company name not found.")
+            return "Company name not found."
 
     elif intent == "first_transaction":
         company = extract_entities(command)
@@ -428,29 +462,62 @@ def interact_once(path=None, context="", mode=False):
             result = get_first_transaction(company)
             if not result.empty:
                 row = result.iloc[0]
-                text_to_voice(
-                    f"The first transaction for {company} was on {row['executedAt']} for {row['executionPrice']}."
+                return TemplateReply(
+                    FIRST_TRANSACTION,
+                    company=company,
+                    date=row["executedAt"],
+                    price=row["executionPrice"],
                 )
             else:
-                text_to_voice("No transactions found.")
+                return "No transactions found."
         else:
-            text_to_voice("Company name not found.")
+            return "Company name not found."
 
     elif intent == "list_companies":
         companies = list_all_companies()
-        text_to_voice(
-            f"I found {len(companies)} companies: {', '.join(companies[:10])}..."
+        return TemplateReply(
+            COMPANY_LIST, count=len(companies), names=", ".join(companies[:10])
         )
 
     elif intent == "transaction_types":
         types = get_transaction_types()
-        text_to_voice(f"Transaction types include: {', '.join(map(str, types))}.")
+        return TemplateReply(TRANSACTION_TYPES, types=", ".join(map(str, types)))
 
     elif intent == "help":
-        text_to_voice(print_help())
+        return print_help()
 
     else:
-        normal_inference(command, context, mode)
+        return None
+
+
+# Replies that never change, synthesized ahead of time. The streaming path
+# speaks them sentence by sentence, so the sentences are warmed up too, and
+# so are the constant fragments of the data reply templates.
+STATIC_PHRASES = [
+    NOT_UNDERSTOOD,
+    GOODBYE,
+    "I couldn't detect a company name.",
+    "Company name not found.",
+    "No transactions found.",
+    "Enhanced Trading Assistant is ready. Say 'help' to learn what I can do.",
+    print_help(),
+]
+
+
+def warm_speech_cache():
+    phrases = set(STATIC_PHRASES)
+    for phrase in STATIC_PHRASES:
+        phrases.update(split_sentences(phrase))
+    for template in TEMPLATES:
+        phrases.update(template_fragments(template))
+    warm_up(speech_cache, sorted(phrases), TTS_VOICE, TTS_MODEL, remote_synthesize)
+
+
+# TTS_WARMUP=1 fills the phrase cache in the background at startup
+speech_warmup = None
+if os.environ.get("TTS_WARMUP") == "1":
+    speech_warmup = threading.Thread(target=warm_speech_cache, daemon=True)
+    speech_warmup.start()
 
 
 # Main loop
@@ -1,26 +1,96 @@
 
-from flask import Flask, request, send_file, render_template, jsonify
+from flask import Flask, Response, request, send_file, render_template, jsonify
+import io
+import json
 import tempfile
+import threading
 import os
-from mistralai import Mistral
-from openai import OpenAI
-import pandas as pd
-from assistant import interact_once
-trade = pd.read_csv("trade.csv")
-bank = pd.read_csv("bank.csv")
+import sys
+from assistant import interact_once, interact_stream
+from lazy import Lazy, all_ready, start_prewarm, status
+from store import UserStore
+
+
+# Data and clients are built on first use so the server starts listening
+# right away; PREWARM=1 builds them in the background after import
+def load_frames():
+    import ingest
+
+    trade, csv_offsets["trade.csv"] = ingest.load_at("trade.csv")
+    bank, csv_offsets["bank.csv"] = ingest.load_at("bank.csv")
+    return trade, bank
+
+
+def build_portfolio():
+    from portfolio import PortfolioStore
+
+    return PortfolioStore(*frames.get())
+
+
+# The semantic tier needs sentence-transformers and its model; without them
+# /plot still gets the exact tier
+def build_plot_cache():
+    from plot_cache import PlotCache, load_embedder, semantic_available
+
+    embed = None
+    if semantic_available():
+        try:
+            embed = load_embedder()
+        except Exception as e:
+            print(f"Semantic plot cache disabled: {e}")
+    return PlotCache(embed)
+
+
+def build_rollups():
+    from rollups import Rollups
+
+    trade, bank = frames.get()
+    return Rollups.build(bank, trade)
+
+
+def build_chart_engine():
+    from charts import ChartEngine
+
+    trade, bank = frames.get()
+    today = max(trade["executedAt"].max(), bank["bookingDate"].max()).normalize()
+    return ChartEngine(store.get(), today, rollups.get())
+
+
+def create_mistral_client():
+    from mistralai import Mistral
+
+    return Mistral(api_key="")
+
+
+# CSV path -> byte offset the loaded frames cover; tails start there
+csv_offsets = {}
+frames = Lazy(load_frames, "frames")
+store = Lazy(lambda: UserStore(*frames.get()), "store")
+portfolio = Lazy(build_portfolio, "portfolio")
+plot_cache = Lazy(build_plot_cache, "plot_cache")
+rollups = Lazy(build_rollups, "rollups")
+chart_engine = Lazy(build_chart_engine, "charts")
 
 app = Flask(__name__)
 
 # Init clients
-openai_client = OpenAI(api_key="")
-mistral_client = Mistral(api_key="")
+mistral_client = Lazy(create_mistral_client, "mistral", client=True)
 
 MODEL_MISTRAL = "mistral-large-latest"
+MODEL_MISTRAL_SPEC = "mistral-small-latest"
+# CHART_PARSER=llm lets Mistral write /chart specs; the default rule-based
+# parser needs no network call
+CHART_PARSER = os.environ.get("CHART_PARSER", "rules")
 user = "0bf3b550-dc5b-4f3e-91f4-162b687b97c6"
 
 @app.route("/data", methods=["GET"])
 def data():
-    return({"trade":trade[trade["userId"]==user].to_json(orient="records"),"bank":bank[bank["userId"]==user].to_json(orient="records")})
+    return Response(store.get().payload(user), mimetype="application/json")
+
+# Aggregated holdings, cash flow and monthly spend for the dashboard cards
+@app.route("/portfolio", methods=["GET"])
+def portfolio_summary():
+    return Response(portfolio.get().payload(user), mimetype="application/json")
 
 @app.route("/voice", methods=["POST"])
 def handle_voice():
@@ -37,16 +107,33 @@ def handle_voice():
         audio_file.save(audio_path)
         print(audio_path)
 
-    interact_once(audio_path,context,mode)
-    out_path = "output.mp3"
+    # Streaming mode: chunked response, one MP3 segment per sentence
+    if request.form.get("stream") == "1":
+        try:
+            speech = interact_stream(audio_path,context,mode)
+        finally:
+            os.remove(audio_path)
+        return Response(speech, mimetype="audio/mpeg")
+
+    try:
+        speech = interact_once(audio_path,context,mode)
+    finally:
+        os.remove(audio_path)
+    if not speech:
+        return jsonify({"error": "Speech synthesis failed"}), 502
 
-    return send_file(out_path, mimetype="audio/mpeg")
+    # Each request gets its own in-memory reply, nothing shared on disk
+    return send_file(io.BytesIO(speech), mimetype="audio/mpeg")
 
 
 @app.route("/plot", methods=["POST"])
 def plot():
     topic = request.form.get("topic", "")
-    chat_response = mistral_client.chat.complete(
+    cached = plot_cache.get().get(topic)
+    if cached is not None:
+        return jsonify({"response": cached})
+
+    chat_response = mistral_client.get().chat.complete(
         model=MODEL_MISTRAL,
         messages=[
             {"role": "system", "content": "Generate valid JavaScript code that plots what the user asks for."},
@@ -55,7 +142,175 @@ def plot():
         temperature=0,
         max_tokens=400
     )
-    return jsonify({"response": chat_response.choices[0].message.content})
+    code = chat_response.choices[0].message.content
+    plot_cache.get().put(topic, code)
+    return jsonify({"response": code})
+
+
+def mistral_chart_spec(system, prompt):
+    response = mistral_client.get().chat.complete(
+        model=MODEL_MISTRAL_SPEC,
+        messages=[
+            {"role": "system", "content": system},
+            {"role": "user", "content": prompt},
+        ],
+        response_format={"type": "json_object"},
+        temperature=0,
+        max_tokens=200,
+    )
+    return json.loads(response.choices[0].message.content)
+
+
+# Chart data instead of chart code: the prompt (form field "prompt") or a
+# ready spec (JSON body {"spec": {...}}) is run against the user's rows and
+# the labels and series come back for the page to draw
+@app.route("/chart", methods=["POST"])
+def chart():
+    engine = chart_engine.get()
+    body = request.get_json(silent=True) or {}
+    try:
+        if "spec" in body:
+            from charts import validate_spec
+
+            spec = validate_spec(body["spec"])
+        else:
+            prompt = request.form.get("prompt") or body.get("prompt", "")
+            ask_llm = mistral_chart_spec if CHART_PARSER == "llm" else None
+            spec = engine.spec_for(prompt, ask_llm)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(engine.run(spec, user))
+
+
+# New trade and bank rows (typed frames from events.py) are folded into the
+# structures built so far instead of rebuilding them: the user partitions,
+# the portfolio payloads of the users they touch, the rollups and, for trades
+# with a CompanyName, the assistant's frame and company index. One batch at a
+# time. The batch is applied to shallow copies (every structure swaps in new
+# dicts rather than changing the ones it has), and the copies replace the
+# live ones only once every step succeeded: readers see a batch either
+# entirely or not at all, and a batch that fails changes nothing.
+ingest_lock = threading.Lock()
+
+
+# All rows of the given users, from their partitions
+def user_rows(partitions, users, like):
+    import pandas as pd
+
+    parts = [partitions[user_id] for user_id in users if user_id in partitions]
+    return pd.concat(parts, ignore_index=True) if parts else like.iloc[:0]
+
+
+def append_events(trade=None, bank=None):
+    import copy
+
+    import assistant
+    import ingest
+
+    trade = None if trade is None or trade.empty else trade
+    bank = None if bank is None or bank.empty else bank
+    if trade is None and bank is None:
+        return set()
+    with ingest_lock:
+        # Build everything from the old rows first, so nothing built later
+        # from the new frames counts a batch twice or misses it
+        partitions, summaries, cubes = store.get(), portfolio.get(), rollups.get()
+        names, index = assistant.df.get(), assistant.company_index.get()
+        partitions, summaries, cubes = copy.copy(partitions), copy.copy(summaries), copy.copy(cubes)
+
+        old_trade, old_bank = frames.get()
+        base = trade.drop(columns="CompanyName", errors="ignore") if trade is not None else None
+        new_frames = (
+            old_trade if base is None else ingest.concat([old_trade, base]),
+            old_bank if bank is None else ingest.concat([old_bank, bank]),
+        )
+        users = partitions.append(base, bank)
+        summaries.refresh(
+            user_rows(partitions.trade, users, old_trade), user_rows(partitions.bank, users, old_bank)
+        )
+        cubes.add(bank, base)
+        engine = None
+        if chart_engine.ready:
+            engine = copy.copy(chart_engine.get())
+            engine.store, engine.rollups = partitions, cubes
+            if base is not None:
+                engine.today = max(engine.today, base["executedAt"].max().normalize())
+            if bank is not None:
+                engine.today = max(engine.today, bank["bookingDate"].max().normalize())
+
+        named = None
+        if trade is not None and "CompanyName" in trade:
+            named = ingest.concat([names, trade.dropna(subset=["CompanyName"])])
+            index = copy.copy(index)
+            index.append(named, len(names))
+
+        frames.set(new_frames)
+        store.set(partitions)
+        portfolio.set(summaries)
+        rollups.set(cubes)
+        if engine is not None:
+            chart_engine.set(engine)
+        if named is not None:
+            assistant.df.set(named)
+            assistant.company_index.set(index)
+        return users
+
+
+def create_event_writer():
+    from events import EventWriter
+
+    return EventWriter(append_events)
+
+
+event_writer = Lazy(create_event_writer)
+
+
+# Worker processes serving the app (gunicorn.conf.py and uvicorn --workers
+# both go by WEB_CONCURRENCY)
+WORKERS = int(os.environ.get("WEB_CONCURRENCY", "1"))
+TAIL_EVENTS = os.environ.get("TAIL_EVENTS") == "1"
+
+
+# Append-only ingestion: a JSON object or list of rows with the columns of
+# trade.csv or bank.csv. With several workers, each holds its own copy of the
+# data and a request reaches only one of them: the rows are appended to the
+# CSV file instead, which every worker tails (202), and without TAIL_EVENTS
+# the request is refused rather than updating one worker only.
+@app.route("/events/<kind>", methods=["POST"])
+def post_events(kind):
+    from events import EventError, append_csv, to_frame
+
+    try:
+        rows = to_frame(request.get_json(silent=True), kind)
+    except EventError as e:
+        return jsonify({"error": str(e)}), 400
+    if WORKERS > 1:
+        if not TAIL_EVENTS:
+            return jsonify({"error": f"/events needs TAIL_EVENTS=1 with {WORKERS} workers"}), 409
+        try:
+            append_csv(f"{kind}.csv", rows)
+        except OSError as e:
+            print(f"Could not append {kind} events: {e}")
+            return jsonify({"error": f"could not append {kind} events: {e}"}), 500
+        return jsonify({"queued": len(rows), "users": int(rows["userId"].nunique())}), 202
+    try:
+        event_writer.get().append(kind, rows)
+    except Exception as e:
+        print(f"Could not append {kind} events: {e}")
+        return jsonify({"error": f"could not append {kind} events: {e}"}), 500
+    return jsonify({"added": len(rows), "users": int(rows["userId"].nunique())})
+
+
+# Hit rates of the /plot cache
+@app.route("/plot/stats", methods=["GET"])
+def plot_stats():
+    return jsonify(plot_cache.get().stats())
+
+
+# 200 once every lazy resource is built, 503 while some are still pending
+@app.route("/ready", methods=["GET"])
+def ready():
+    return jsonify({"ready": all_ready(), "resources": status()}), 200 if all_ready() else 503
 
 
 @app.route("/")
@@ -63,5 +318,26 @@ def hello_world():
     return render_template("index.html")
 
 
+if os.environ.get("PREWARM") == "1":
+    start_prewarm()
+
+# TAIL_EVENTS=1 also picks up rows appended to trade.csv and bank.csv while
+# the server runs. Each tail starts where the loaded frames end, so a worker
+# forked (or respawned) from a master that loaded them long ago first
+# catches up on every row appended since.
+def start_tail():
+    from events import tail
+
+    frames.get()
+    for kind in ("trade", "bank"):
+        path = f"{kind}.csv"
+        tail(path, kind, lambda rows, kind=kind: event_writer.get().append(kind, rows), offset=csv_offsets.get(path))
+
+
+# Under gunicorn the app is imported in the master before the fork, which
+# threads do not survive; its workers start their tails in post_fork
+if TAIL_EVENTS and "gunicorn" not in sys.modules:
+    start_tail()
+
 if __name__ == "__main__":
-    app.run("0.0.0.0", 8078)
+    app.run("0.0.0.0", 8078, threaded=True)
@@ -0,0 +1,29 @@
+import time
+
+import back
+
+# /chart end to end on the sample data: rule-based spec, pandas execution on
+# the user's rows, JSON response size. /plot pays an LLM call per prompt and
+# up to 400 tokens of generated script instead.
+PROMPTS = [
+    "Show me grocery spending last month",
+    "Plot my monthly card spending",
+    "Pie chart of spending by category",
+    "Bar chart of my top 5 holdings",
+    "Compare buys and sells per month",
+    "How many restaurant payments per week",
+    "Income by type",
+    "Average trade size by type",
+]
+ROUNDS = 50
+
+if __name__ == "__main__":
+    client = back.app.test_client()
+    back.chart_engine.get()
+    print(f"{'ms':>7} {'bytes':>6}  prompt")
+    for prompt in PROMPTS:
+        start = time.perf_counter()
+        for _ in range(ROUNDS):
+            response = client.post("/chart", data={"prompt": prompt})
+        elapsed = (time.perf_counter() - start) / ROUNDS * 1000
+        print(f"{elapsed:>7.2f} {len(response.data):>6}  {prompt}")
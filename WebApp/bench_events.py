@@ -0,0 +1,141 @@
+import argparse
+import json
+import threading
+import time
+
+import assistant
+import back
+import ingest
+from company_index import CompanyIndex
+from events import EventWriter, to_frame
+from portfolio import PortfolioStore
+from rollups import Rollups
+from store import UserStore
+
+# Sustained append throughput: the last --share of the trade and bank rows
+# is held back, everything is built from the rest, and the held-back rows are
+# replayed through the event writer (what /events uses) by one or more
+# producers posting a few rows each, while a reader thread keeps serving
+# /data, /portfolio and /chart payloads. Afterwards the incrementally updated
+# structures are compared with a full rebuild from all rows.
+# (rows per post, concurrent producers)
+RUNS = [(1, 1), (1, 8), (10, 8), (100, 1), (1000, 1)]
+SPEC = {
+    "source": "bank",
+    "metric": "sum",
+    "field": "amount",
+    "groupBy": None,
+    "bucket": "month",
+    "chart": "line",
+    "limit": 10,
+    "filters": {"side": ["DEBIT"]},
+}
+
+
+def split(frame, share):
+    cut = int(len(frame) * (1 - share))
+    return frame.iloc[:cut].reset_index(drop=True), frame.iloc[cut:].reset_index(drop=True)
+
+
+def reset(trade, bank, named):
+    for resource in (back.store, back.portfolio, back.rollups, back.chart_engine, assistant.company_index):
+        resource.ready = False
+    back.frames.set((trade, bank))
+    assistant.df.set(named)
+    back.chart_engine.get()
+    back.portfolio.get()
+    assistant.company_index.get()
+
+
+def reader(stop, counts):
+    while not stop.is_set():
+        store, portfolio, engine = back.store.get(), back.portfolio.get(), back.chart_engine.get()
+        for user_id in list(store.payloads)[:20]:
+            json.loads(store.payload(user_id))
+            json.loads(portfolio.payload(user_id))
+            engine.run(SPEC, user_id)
+            counts[0] += 1
+
+
+def produce(writer, posts):
+    for kind, rows in posts:
+        writer.append(kind, rows)
+
+
+def replay(trade_events, bank_events, size, producers):
+    writer = EventWriter(back.append_events)
+    posts = [
+        (kind, events.iloc[offset : offset + size])
+        for kind, events in (("trade", trade_events), ("bank", bank_events))
+        for offset in range(0, len(events), size)
+    ]
+    stop = threading.Event()
+    counts = [0]
+    thread = threading.Thread(target=reader, args=(stop, counts))
+    thread.start()
+    start = time.perf_counter()
+    threads = [threading.Thread(target=produce, args=(writer, posts[i::producers])) for i in range(producers)]
+    for producer in threads:
+        producer.start()
+    for producer in threads:
+        producer.join()
+    elapsed = time.perf_counter() - start
+    stop.set()
+    thread.join()
+    return elapsed, counts[0] / elapsed
+
+
+def check(trade, bank, named):
+    store = back.store.get()
+    full = UserStore(trade, bank)
+    assert store.payloads == full.payloads, "user payloads differ"
+    portfolio = PortfolioStore(trade, bank)
+    assert {u: json.loads(p) for u, p in back.portfolio.get().payloads.items()} == {
+        u: json.loads(p) for u, p in portfolio.payloads.items()
+    }, "portfolio payloads differ"
+    rollups = Rollups.build(bank, trade)
+    for user_id in list(full.bank)[:50]:
+        ours = back.rollups.get().bank.query(user_id, by="type", bucket="month")
+        theirs = rollups.bank.query(user_id, by="type", bucket="month")
+        assert ours["type"] == theirs["type"] and abs(ours["amount"] - theirs["amount"]).max() < 1e-6
+    index, rebuilt = assistant.company_index.get(), CompanyIndex(named)
+    assert index.rows.keys() == rebuilt.rows.keys() and index.first == rebuilt.first and index.last == rebuilt.last
+    assert all(index.stats[name][:2] == rebuilt.stats[name][:2] for name in rebuilt.stats)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--share", type=float, default=0.2)
+    parser.add_argument("--events", type=int, default=1000)
+    args = parser.parse_args()
+
+    trade, bank = ingest.load("trade.csv"), ingest.load("bank.csv")
+    named = ingest.load(assistant.CSV_FILE)
+    names = dict(zip(named["ISIN"].astype(str), named["CompanyName"].astype(str)))
+    trade_base, trade_events = split(trade, args.share)
+    bank_base, bank_events = split(bank, args.share)
+    named_base = named[named.index < len(named) * (1 - args.share)]
+
+    # Events look like what /events receives: plain JSON rows, CompanyName added
+    trade_events = trade_events.assign(CompanyName=trade_events["ISIN"].astype(str).map(names))
+    trade_events = to_frame(json.loads(trade_events.to_json(orient="records", date_format="iso")), "trade")
+    bank_events = to_frame(json.loads(bank_events.to_json(orient="records", date_format="iso")), "bank")
+
+    print(f"{'rows/post':>9} {'producers':>9} {'events':>7} {'seconds':>8} {'events/s':>9} {'reads/s':>8}")
+    for size, producers in RUNS:
+        reset(trade_base, bank_base, named_base)
+        count = min(args.events, len(trade_events) + len(bank_events))
+        trade_part = trade_events.iloc[: count // 3]
+        bank_part = bank_events.iloc[: count - len(trade_part)]
+        elapsed, reads = replay(trade_part, bank_part, size, producers)
+        print(f"{size:>9} {producers:>9} {count:>7} {elapsed:>8.2f} {count / elapsed:>9.0f} {reads:>8.0f}")
+
+    # Everything held back, in order, then the same state rebuilt from scratch
+    reset(trade_base, bank_base, named_base)
+    replay(trade_events, bank_events, 50, 1)
+    check(
+        ingest.concat([trade_base, trade_events.drop(columns="CompanyName")]),
+        ingest.concat([bank_base, bank_events]),
+        ingest.concat([named_base, trade_events.dropna(subset=["CompanyName"])]),
+    )
+    print("incremental state matches a full rebuild")
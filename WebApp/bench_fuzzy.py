@@ -0,0 +1,50 @@
+import random
+import string
+import time
+
+import pandas as pd
+
+from company_index import CompanyIndex
+
+# Entity resolution latency of CompanyIndex.fuzzy_match as the number of
+# distinct instruments grows. Synthetic names mix the real company names
+# with random ones so the trigram distribution stays realistic.
+SIZES = [1_000, 10_000, 50_000]
+SUFFIXES = ["inc", "corp", "ag", "se", "plc", "ltd", "co", "sa", "nv", "group"]
+QUERIES = [
+    "how many transactions for nvidia",
+    "what is the total value for siemens energy",
+    "the last transaction for amazon",
+    "rheinmetall",
+    "tell me a joke",
+]
+
+
+def synthesize(real, size, seed=0):
+    rnd = random.Random(seed)
+    names = list(real)
+    while len(names) < size:
+        words = [
+            "".join(rnd.choices(string.ascii_lowercase, k=rnd.randint(3, 9)))
+            for _ in range(rnd.randint(1, 3))
+        ]
+        names.append(" ".join(words + [rnd.choice(SUFFIXES)]))
+    return pd.DataFrame(
+        {"CompanyName": names, "executionPrice": 1.0, "executedAt": "2024-06-03"}
+    )
+
+
+if __name__ == "__main__":
+    real = pd.read_csv("tradeFiltered.csv")["CompanyName"].dropna().unique()
+    print(f"{'names':>8} {'build s':>8} {'ms/query':>9}")
+    for size in SIZES:
+        df = synthesize(real, size)
+        start = time.perf_counter()
+        index = CompanyIndex(df)
+        build = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for query in QUERIES:
+            index.fuzzy_match(query)
+        per_query = (time.perf_counter() - start) / len(QUERIES) * 1000
+        print(f"{size:>8} {build:>8.2f} {per_query:>9.2f}")
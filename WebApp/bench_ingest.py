@@ -0,0 +1,45 @@
+import argparse
+import os
+import tempfile
+import time
+
+import pandas as pd
+
+import ingest
+
+# Load time and memory of the trade and bank data: plain read_csv (object
+# strings, text dates), the typed CSV parse, and the memory-mapped Feather
+# snapshot. --scale repeats the rows to get a larger file.
+FILES = ["trade.csv", "bank.csv", "tradeFiltered.csv"]
+
+
+def timed(load, path, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        df = load(path)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return df, best
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scale", type=int, default=10)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    print(f"{'file':>18} {'rows':>9} {'loader':>9} {'seconds':>8} {'MB':>8}")
+    for name in FILES:
+        path = os.path.join(directory, name)
+        pd.concat([pd.read_csv(name)] * args.scale).to_csv(path, index=False)
+        ingest.write_snapshot(ingest.read_typed_csv(path), ingest.snapshot_path(path))
+
+        for label, load in (
+            ("read_csv", pd.read_csv),
+            ("typed", ingest.read_typed_csv),
+            ("snapshot", lambda p: ingest.read_snapshot(ingest.snapshot_path(p))),
+        ):
+            df, seconds = timed(load, path)
+            memory = df.memory_usage(deep=True).sum() / 1e6
+            print(f"{name:>18} {len(df):>9} {label:>9} {seconds:>8.3f} {memory:>8.1f}")
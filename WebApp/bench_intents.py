@@ -0,0 +1,69 @@
+import random
+import sys
+import time
+
+from intents import TOKEN_MASKS, detect_intent, detect_intent_reference
+
+# Checks the compiled intent table against the reference matcher on a fixed
+# corpus plus random utterances built from every pattern word and synonym,
+# then times both.
+CORPUS = [
+    "How many transactions for Nvidia?",
+    "What is the total value for Apple?",
+    "What's the total worth of my Tesla trades",
+    "Which company has the most transactions?",
+    "Who is the top company?",
+    "Tell me the last transaction for Amazon",
+    "Tell me the first transaction for BYD",
+    "What are the transaction types?",
+    "What types of transactions are there",
+    "What is the current stock price of Microsoft?",
+    "How much is the stock of Siemens?",
+    "How much does a share cost",
+    "What is the average value for Rheinmetall?",
+    "Average txn for Healwell",
+    "List all companies",
+    "Show me the companies",
+    "Help",
+    "What can you do?",
+    "Enough!",
+    "Stop",
+    "quit",
+    "Tell me a joke",
+    "",
+]
+FILLER = ["for", "the", "me", "my", "apple", "nvidia", "please", "a", "of", "is"]
+RANDOM_UTTERANCES = 20_000
+
+
+def random_corpus(seed=0):
+    rnd = random.Random(seed)
+    words = list(TOKEN_MASKS) + FILLER
+    return [
+        " ".join(rnd.choices(words, k=rnd.randint(1, 8)))
+        for _ in range(RANDOM_UTTERANCES)
+    ]
+
+
+def timed(fn, corpus):
+    start = time.perf_counter()
+    for command in corpus:
+        fn(command)
+    return (time.perf_counter() - start) / len(corpus) * 1e6
+
+
+if __name__ == "__main__":
+    corpus = CORPUS + random_corpus()
+    mismatches = [
+        command
+        for command in corpus
+        if detect_intent(command) != detect_intent_reference(command)
+    ]
+    for command in mismatches[:20]:
+        print(
+            f"MISMATCH {command!r}: {detect_intent(command)} != {detect_intent_reference(command)}"
+        )
+    print(f"{len(corpus)} utterances, {len(mismatches)} mismatches")
+    print(f"reference: {timed(detect_intent_reference, corpus):.2f} us/utterance")
+    print(f"compiled:  {timed(detect_intent, corpus):.2f} us/utterance")
+    sys.exit(1 if mismatches else 0)
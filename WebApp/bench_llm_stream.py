@@ -0,0 +1,144 @@
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# End-to-end latency of the LLM -> TTS path against a local fake OpenAI
+# server. The fake chat endpoint emits the answer word by word on a
+# configurable schedule; the fake speech endpoint takes longer for longer
+# text. Three ways of producing speech are compared:
+#   blocking  - wait for the whole completion, synthesize it in one call
+#   sentences - wait for the whole completion, stream TTS per sentence
+#   tokens    - stream the completion and send each sentence to TTS as soon
+#               as it is complete
+STUB_PORT = 8097
+ANSWER = (
+    "Your portfolio moved a little today, mostly because of tech. "
+    "Nvidia carried most of the gains while the rest stayed flat. "
+    "Cash is unchanged, and there are no pending orders. "
+    "Let me know if you want to look at a specific position."
+)
+FAKE_MP3 = b"\xff\xf3" + b"\x00" * 1024
+
+
+def stub_handler(options):
+    class StubOpenAI(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            if self.path.endswith("/speech"):
+                time.sleep(options.tts_base + len(body["input"]) * options.tts_per_char)
+                self.send_response(200)
+                self.send_header("Content-Type", "audio/mpeg")
+                self.send_header("Content-Length", str(len(FAKE_MP3)))
+                self.end_headers()
+                self.wfile.write(FAKE_MP3)
+                return
+
+            time.sleep(options.first_token)
+            words = [word + " " for word in ANSWER.split(" ")]
+            if not body.get("stream"):
+                time.sleep(options.token_interval * (len(words) - 1))
+                self.send_json(
+                    {
+                        "id": "stub",
+                        "object": "chat.completion",
+                        "created": 0,
+                        "model": body["model"],
+                        "choices": [
+                            {
+                                "index": 0,
+                                "message": {"role": "assistant", "content": ANSWER},
+                                "finish_reason": "stop",
+                            }
+                        ],
+                    }
+                )
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.end_headers()
+            for i, word in enumerate(words):
+                if i:
+                    time.sleep(options.token_interval)
+                chunk = {
+                    "id": "stub",
+                    "object": "chat.completion.chunk",
+                    "created": 0,
+                    "model": body["model"],
+                    "choices": [{"index": 0, "delta": {"content": word}, "finish_reason": None}],
+                }
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                self.wfile.flush()
+            self.wfile.write(b"data: [DONE]\n\n")
+
+        def send_json(self, body):
+            data = json.dumps(body).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    return StubOpenAI
+
+
+async def measure(speech):
+    start = time.perf_counter()
+    first = None
+    async for _ in speech:
+        if first is None:
+            first = time.perf_counter() - start
+    return first, time.perf_counter() - start
+
+
+async def run(voice_pipeline):
+    from tts_stream import aiter_sentences, astream_speech, split_sentences
+
+    async def blocking():
+        reply = await voice_pipeline.chat_reply("how am I doing", "", "normal")
+        yield await voice_pipeline.synthesize(reply)
+
+    async def sentences():
+        reply = await voice_pipeline.chat_reply("how am I doing", "", "normal")
+        async for audio in astream_speech(split_sentences(reply), voice_pipeline.synthesize):
+            yield audio
+
+    def tokens():
+        stream = voice_pipeline.chat_reply_stream("how am I doing", "", "normal")
+        return astream_speech(aiter_sentences(stream), voice_pipeline.synthesize)
+
+    for name, speech in (("blocking", blocking), ("sentences", sentences), ("tokens", tokens)):
+        first, total = await measure(speech())
+        print(f"{name:>9}: first audio {first:.2f}s, complete {total:.2f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--first-token", type=float, default=0.4)
+    parser.add_argument("--token-interval", type=float, default=0.03)
+    parser.add_argument("--tts-base", type=float, default=0.15)
+    parser.add_argument("--tts-per-char", type=float, default=0.004)
+    options = parser.parse_args()
+
+    stub = ThreadingHTTPServer(("127.0.0.1", STUB_PORT), stub_handler(options))
+    multiprocessing.Process(target=stub.serve_forever, daemon=True).start()
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{STUB_PORT}/v1"
+    os.environ.setdefault("OPENAI_API_KEY", "stub")
+
+    import voice_pipeline
+    import assistant
+    from tts_cache import SpeechCache
+
+    # Measure the uncached speech path: a cache with no room keeps nothing
+    assistant.speech_cache = SpeechCache(tempfile.mkdtemp(), memory_bytes=0, disk_bytes=0)
+
+    print(vars(options))
+    asyncio.run(run(voice_pipeline))
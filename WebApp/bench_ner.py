@@ -0,0 +1,46 @@
+import time
+
+import spacy
+
+from assistant import NER_DISABLED
+
+# Per-utterance NER cost of the full en_core_web_sm pipeline against the
+# trimmed one assistant.py loads. The old extract_entities could parse the
+# same utterance twice, so both a single and a double parse are shown.
+UTTERANCES = [
+    "How many transactions for Nvidia?",
+    "What is the current stock price of Apple?",
+    "What is the total value for Siemens Energy?",
+    "Tell me the last transaction for Amazon",
+    "What is the average value for BYD?",
+    "Which company has the most transactions?",
+    "How much is the Tesla stock worth today?",
+    "List all companies",
+]
+ROUNDS = 50
+
+
+def per_utterance_ms(nlp, parses=1):
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        for utterance in UTTERANCES:
+            for _ in range(parses):
+                nlp(utterance)
+    return (time.perf_counter() - start) / (ROUNDS * len(UTTERANCES)) * 1000
+
+
+def organizations(nlp, utterance):
+    return [ent.text for ent in nlp(utterance).ents if ent.label_ == "ORG"]
+
+
+if __name__ == "__main__":
+    full = spacy.load("en_core_web_sm")
+    trimmed = spacy.load("en_core_web_sm", disable=NER_DISABLED)
+
+    for utterance in UTTERANCES:
+        if organizations(full, utterance) != organizations(trimmed, utterance):
+            print(f"ORG mismatch for {utterance!r}")
+
+    print(f"full pipeline, two parses: {per_utterance_ms(full, 2):.2f} ms")
+    print(f"full pipeline, one parse:  {per_utterance_ms(full):.2f} ms")
+    print(f"trimmed pipeline:          {per_utterance_ms(trimmed):.2f} ms")
@@ -0,0 +1,53 @@
+import random
+import statistics
+import time
+from types import SimpleNamespace
+
+import back
+
+# /plot latency and cache hit rate for a skewed stream of chart requests.
+# Mistral is replaced by a fake with MISTRAL_LATENCY per call. Each request
+# family comes in spelling variants (exact tier after normalization) and in
+# paraphrases, which only the semantic tier can match (it is used when
+# sentence-transformers is installed).
+MISTRAL_LATENCY = 1.5
+REQUESTS = 200
+FAMILIES = [
+    ["Show me grocery spending last month", "show me grocery spending last month!", "Show my grocery spend for last month"],
+    ["Plot my monthly card spending", "plot my monthly card spending.", "Chart of card spending per month"],
+    ["Bar chart of my top 5 holdings", "bar chart of my top 5 holdings", "Show my five biggest holdings as bars"],
+    ["Pie chart of spending by category", "PIE CHART OF SPENDING BY CATEGORY", "Spending by category as a pie chart"],
+    ["Line chart of my cash balance", "line chart of my cash balance?", "Plot how my cash balance changed"],
+    ["Compare buys and sells per month", "compare buys and sells per month", "Monthly buys versus sells"],
+]
+
+
+class FakeMistral:
+    def __init__(self):
+        self.chat = SimpleNamespace(complete=self.complete)
+
+    def complete(self, messages, **kwargs):
+        time.sleep(MISTRAL_LATENCY)
+        code = f"// chart for {messages[-1]['content']}"
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=code))])
+
+
+if __name__ == "__main__":
+    back.mistral_client.set(FakeMistral())
+    client = back.app.test_client()
+    rnd = random.Random(0)
+    weights = [1 / (rank + 1) for rank in range(len(FAMILIES))]
+
+    latencies = []
+    for _ in range(REQUESTS):
+        family = rnd.choices(FAMILIES, weights)[0]
+        topic = rnd.choice(family)
+        start = time.perf_counter()
+        client.post("/plot", data={"topic": topic})
+        latencies.append(time.perf_counter() - start)
+
+    stats = client.get("/plot/stats").get_json()
+    print(f"{REQUESTS} requests, mistral {MISTRAL_LATENCY}s per call")
+    print(f"exact hits {stats['exactHits']}, semantic hits {stats['semanticHits']}, misses {stats['misses']}")
+    print(f"hit rate {stats['hitRate']:.0%} (semantic tier {'on' if stats['semantic'] else 'off'})")
+    print(f"p50 {statistics.median(latencies) * 1000:.1f} ms, mean {statistics.mean(latencies) * 1000:.1f} ms")
@@ -0,0 +1,83 @@
+import json
+import time
+
+import pandas as pd
+
+from bench_store import synthesize
+from portfolio import PortfolioStore
+from store import UserStore
+
+# Build time of the per-user portfolio aggregates and the size of what the
+# browser downloads: /portfolio summaries against the raw /data rows. First
+# checks that positions without a known cost basis stay out of invested.
+SIZES = [(100, 10_000), (1_000, 100_000), (5_000, 500_000)]
+CATEGORIES = ["userId", "ISIN", "direction", "currency", "type", "side"]
+
+
+def typed(frame):
+    frame = frame.astype({column: "category" for column in CATEGORIES if column in frame})
+    for column in ("executedAt", "bookingDate"):
+        if column in frame:
+            frame[column] = pd.to_datetime(frame[column])
+    return frame
+
+
+# One ISIN bought and partly sold, one only sold (its buys predate the data)
+# and one sold beyond what was bought
+def check_unknown_basis():
+    trade = typed(
+        pd.DataFrame(
+            {
+                "userId": "u",
+                "executedAt": "2024-06-03",
+                "ISIN": ["LONG", "LONG", "SOLD", "SHORT", "SHORT"],
+                "direction": ["BUY", "SELL", "SELL", "BUY", "SELL"],
+                "executionSize": [10.0, 4.0, 5.0, 2.0, 3.0],
+                "executionPrice": [10.0, 12.0, 20.0, 50.0, 60.0],
+                "currency": "EUR",
+                "executionFee": [1.0, 1.0, 1.0, 1.0, 1.0],
+                "type": "REGULAR",
+            }
+        )
+    )
+    bank = typed(
+        pd.DataFrame(
+            {
+                "userId": ["u"],
+                "bookingDate": ["2024-06-03"],
+                "side": ["CREDIT"],
+                "amount": [100.0],
+                "currency": ["EUR"],
+                "type": ["PAYIN"],
+                "mcc": [float("nan")],
+            }
+        )
+    )
+    summary = json.loads(PortfolioStore(trade, bank).payload("u"))
+    holdings = {holding["isin"]: holding for holding in summary["holdings"]}
+    assert holdings["LONG"]["size"] == 6 and holdings["LONG"]["costBasis"] == 60.6
+    assert holdings["SOLD"]["size"] == -5 and holdings["SOLD"]["costBasis"] is None
+    assert holdings["SHORT"]["size"] == -1 and holdings["SHORT"]["costBasis"] is None
+    assert summary["invested"] == 60.6
+
+
+if __name__ == "__main__":
+    check_unknown_basis()
+    print("positions without a known cost basis stay out of invested")
+    print(f"{'users':>8} {'rows':>10} {'build s':>8} {'summary KB':>11} {'rows KB':>9}")
+    for users, rows in SIZES:
+        trade, bank, user_ids = synthesize(users, rows)
+        trade, bank = typed(trade), typed(bank)
+        bank["mcc"] = bank["mcc"].astype("float32")
+        bank["type"] = bank["type"].cat.add_categories(["PAYIN"])
+        bank.loc[bank["side"] == "CREDIT", "type"] = "PAYIN"
+
+        start = time.perf_counter()
+        portfolio = PortfolioStore(trade, bank)
+        build = time.perf_counter() - start
+
+        store = UserStore(trade, bank)
+        sample = user_ids[:100]
+        summary = sum(len(portfolio.payload(user)) for user in sample) / len(sample) / 1024
+        raw = sum(len(store.payload(user)) for user in sample) / len(sample) / 1024
+        print(f"{users:>8} {rows:>10} {build:>8.2f} {summary:>11.1f} {raw:>9.1f}")
@@ -0,0 +1,39 @@
+import threading
+import time
+
+from quotes import QuoteService
+
+# Fifty users ask for the same symbol at once; with single-flight coalescing
+# only one upstream call is made and everyone gets its price.
+USERS = 50
+UPSTREAM_LATENCY = 0.5
+
+upstream_calls = 0
+
+
+def fake_upstream(ticker_symbol):
+    global upstream_calls
+    upstream_calls += 1
+    time.sleep(UPSTREAM_LATENCY)
+    return 123.45
+
+
+if __name__ == "__main__":
+    service = QuoteService(fake_upstream)
+    barrier = threading.Barrier(USERS)
+    prices = []
+
+    def ask():
+        barrier.wait()
+        prices.append(service.get("NVDA"))
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=ask) for _ in range(USERS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    print(f"{USERS} concurrent requests, {upstream_calls} upstream call(s), {elapsed:.2f}s")
+    print(f"all answered: {len(prices) == USERS and set(prices) == {123.45}}")
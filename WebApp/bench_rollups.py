@@ -0,0 +1,124 @@
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import pandas as pd
+
+import ingest
+from charts import ChartEngine, field_values, validate_spec
+from rollups import Rollups
+from store import UserStore
+
+# Range queries on a synthesized dataset: --scale copies of the bank and
+# trade rows, each copy shifted back by a year so every user has --scale
+# years of history. Each query is answered three ways: groupby over the whole
+# frame, groupby over the user's partition (the /chart path without
+# rollups), and summing rollup buckets.
+QUERIES = 200
+SPECS = [
+    {"source": "bank", "metric": "sum", "filters": {"side": "DEBIT"}, "bucket": "month"},
+    {"source": "bank", "metric": "sum", "filters": {"side": "DEBIT"}, "groupBy": "mcc"},
+    {"source": "bank", "metric": "count", "filters": {"type": ["CARD", "CARD_ORDER"]}, "bucket": "week"},
+    {"source": "trade", "metric": "sum", "field": "notional", "groupBy": "ISIN"},
+    {"source": "trade", "metric": "sum", "field": "netSize", "groupBy": "ISIN"},
+    {"source": "trade", "metric": "mean", "field": "executionSize", "groupBy": "direction", "bucket": "month"},
+]
+
+
+def synthesize(frame, date, scale):
+    copies = []
+    for year in range(scale):
+        copy = frame.copy()
+        copy[date] = copy[date] - pd.DateOffset(years=year)
+        copies.append(copy)
+    return pd.concat(copies, ignore_index=True)
+
+
+def random_range(first, last):
+    days = (last - first).days
+    since = first + pd.Timedelta(days=random.randrange(days))
+    until = since + pd.Timedelta(days=random.randrange(1, days))
+    return {"since": since.date().isoformat(), "until": min(until, last).date().isoformat()}
+
+
+def whole_frame(frame, spec, user_id):
+    date = "executedAt" if spec["source"] == "trade" else "bookingDate"
+    mask = frame["userId"] == user_id
+    for column, values in spec["filters"].items():
+        mask &= frame[column].isin(values)
+    mask &= (frame[date] >= pd.Timestamp(spec["since"])) & (
+        frame[date] < pd.Timestamp(spec["until"]) + pd.Timedelta(days=1)
+    )
+    rows = frame[mask]
+    values = field_values(rows, spec["field"])
+    keys = []
+    if spec["bucket"]:
+        keys.append(rows[date].dt.to_period(spec["bucket"][0].upper()).dt.start_time)
+    if spec["groupBy"]:
+        keys.append(rows[spec["groupBy"]])
+    return values.groupby(keys, observed=True).agg(spec["metric"])
+
+
+# Sums over buckets add up in a different order than over rows, which can
+# move a rounded value by a cent
+def same(a, b):
+    return a["labels"] == b["labels"] and all(
+        x["name"] == y["name"] and all(abs(p - q) <= 0.011 for p, q in zip(x["values"], y["values"]))
+        for x, y in zip(a["series"], b["series"])
+    ) and len(a["series"]) == len(b["series"])
+
+
+def timed(run, queries):
+    start = time.perf_counter()
+    for spec, user_id in queries:
+        run(spec, user_id)
+    return (time.perf_counter() - start) / len(queries) * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scale", type=int, default=10)
+    args = parser.parse_args()
+    random.seed(0)
+
+    trade = synthesize(ingest.load("trade.csv"), "executedAt", args.scale)
+    bank = synthesize(ingest.load("bank.csv"), "bookingDate", args.scale)
+    print(f"{len(trade)} trade rows, {len(bank)} bank rows")
+
+    start = time.perf_counter()
+    rollups = Rollups.build(bank, trade)
+    print(f"rollups built in {time.perf_counter() - start:.2f}s")
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, "rollups.npz")
+    rollups.save(path)
+    size = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+    start = time.perf_counter()
+    Rollups.load(path)
+    print(f"rollup files {size / 1e6:.2f} MB, loaded in {time.perf_counter() - start:.3f}s")
+
+    store = UserStore(trade, bank)
+    today = max(trade["executedAt"].max(), bank["bookingDate"].max()).normalize()
+    partitions = ChartEngine(store, today)
+    cubes = ChartEngine(store, today, rollups)
+
+    queries = []
+    for _ in range(QUERIES):
+        spec = dict(random.choice(SPECS))
+        source = spec["source"]
+        frame = trade if source == "trade" else bank
+        date = "executedAt" if source == "trade" else "bookingDate"
+        spec.update(random_range(frame[date].min(), frame[date].max()))
+        users = list(store.trade if source == "trade" else store.bank)
+        queries.append((validate_spec(spec), random.choice(users)))
+
+    mismatches = sum(not same(partitions.run(spec, user_id), cubes.run(spec, user_id)) for spec, user_id in queries)
+    print(f"{mismatches} of {QUERIES} answers differ between partitions and rollups")
+    print(f"{'method':>12} {'ms/query':>9}")
+    for name, run in (
+        ("whole frame", lambda spec, user_id: whole_frame(trade if spec["source"] == "trade" else bank, spec, user_id)),
+        ("partition", partitions.run),
+        ("rollups", cubes.run),
+    ):
+        print(f"{name:>12} {timed(run, queries):>9.2f}")
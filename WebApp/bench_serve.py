@@ -0,0 +1,108 @@
+import argparse
+import asyncio
+import multiprocessing
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+
+# Requests/sec of the gunicorn serving mode as the number of workers grows,
+# and the memory each worker adds. Every worker count gets a fresh server
+# (gunicorn.conf.py) and is loaded by CLIENTS processes that each keep
+# CONNECTIONS requests in flight against PATH. Memory is reported as PSS,
+# which splits pages shared between processes fairly; with preload and
+# copy-on-write the per-worker PSS stays well below its RSS.
+PORT = 8095
+PATH = "/data"
+CLIENTS = 2
+CONNECTIONS = 16
+
+
+async def hammer(duration):
+    done = 0
+    deadline = time.perf_counter() + duration
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{PORT}") as client:
+
+        async def connection():
+            nonlocal done
+            while time.perf_counter() < deadline:
+                response = await client.get(PATH)
+                response.raise_for_status()
+                done += 1
+
+        await asyncio.gather(*(connection() for _ in range(CONNECTIONS)))
+    return done
+
+
+def client_process(duration):
+    return asyncio.run(hammer(duration))
+
+
+def memory(pid):
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            key, _, rest = line.partition(":")
+            if key in ("Rss", "Pss"):
+                values[key] = int(rest.split()[0]) / 1024
+    return values["Rss"], values["Pss"]
+
+
+def children(pid):
+    found = []
+    for entry in os.listdir("/proc"):
+        if entry.isdigit():
+            try:
+                with open(f"/proc/{entry}/stat") as f:
+                    if int(f.read().rsplit(")", 1)[1].split()[1]) == pid:
+                        found.append(int(entry))
+            except OSError:
+                pass
+    return found
+
+
+def wait_ready(timeout=120):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{PORT}/ready").status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError("server did not become ready")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", default=f"1,2,4,{multiprocessing.cpu_count()}")
+    parser.add_argument("--duration", type=float, default=10)
+    args = parser.parse_args()
+    os.environ.setdefault("OPENAI_API_KEY", "stub")
+
+    counts = sorted({int(n) for n in args.workers.split(",")})
+    print(f"{multiprocessing.cpu_count()} cores, {CLIENTS}x{CONNECTIONS} connections on {PATH}")
+    print(f"{'workers':>7} {'req/s':>8} {'master MB':>10} {'worker RSS':>11} {'worker PSS':>11}")
+    for count in counts:
+        server = subprocess.Popen(
+            [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py",
+             "--workers", str(count), "--bind", f"127.0.0.1:{PORT}", "--log-level", "warning"],
+            stdout=subprocess.DEVNULL,
+        )
+        try:
+            wait_ready()
+            with multiprocessing.Pool(CLIENTS) as pool:
+                start = time.perf_counter()
+                done = sum(pool.map(client_process, [args.duration] * CLIENTS))
+                rate = done / (time.perf_counter() - start)
+
+            master_rss, _ = memory(server.pid)
+            workers = [memory(pid) for pid in children(server.pid)]
+            rss = sum(w[0] for w in workers) / len(workers)
+            pss = sum(w[1] for w in workers) / len(workers)
+            print(f"{count:>7} {rate:>8.0f} {master_rss:>10.0f} {rss:>11.0f} {pss:>11.0f}")
+        finally:
+            server.terminate()
+            server.wait()
@@ -0,0 +1,74 @@
+import os
+import random
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Time to audio for data replies ("There are 12 transactions for Nvidia.")
+# against a fake speech endpoint whose latency grows with the text:
+#   whole   - every reply synthesized as one sentence (unique text, no reuse)
+#   spliced - warmed template fragments plus freshly synthesized slots
+#   repeat  - the same replies again, slots now cached as well
+STUB_PORT = 8994
+TTS_BASE = 0.15
+TTS_PER_CHAR = 0.004
+REPLIES = 20
+
+
+class StubSpeech(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        text = body.split(b'"input":')[1].split(b'"')[1]
+        time.sleep(TTS_BASE + TTS_PER_CHAR * len(text))
+        # ID3v2 header followed by "frames"
+        audio = b"ID3\x04\x00\x00\x00\x00\x00\x04" + b"tag!" + b"\xff\xfb" + text
+        self.send_response(200)
+        self.send_header("Content-Type", "audio/mpeg")
+        self.send_header("Content-Length", str(len(audio)))
+        self.end_headers()
+        self.wfile.write(audio)
+
+    def log_message(self, *args):
+        pass
+
+
+def timed(synthesize, replies):
+    start = time.perf_counter()
+    for reply in replies:
+        synthesize(reply)
+    return (time.perf_counter() - start) / len(replies) * 1000
+
+
+if __name__ == "__main__":
+    stub = ThreadingHTTPServer(("127.0.0.1", STUB_PORT), StubSpeech)
+    threading.Thread(target=stub.serve_forever, daemon=True).start()
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{STUB_PORT}/v1"
+    os.environ.setdefault("OPENAI_API_KEY", "stub")
+
+    import assistant
+    from spliced import TemplateReply
+    from tts_cache import SpeechCache
+
+    assistant.openai_client.get().api_key = os.environ["OPENAI_API_KEY"]
+    assistant.speech_cache = SpeechCache(tempfile.mkdtemp())
+    companies = assistant.df.get()["CompanyName"].dropna().unique()
+    rnd = random.Random(0)
+    replies = [
+        TemplateReply(
+            assistant.TRANSACTION_COUNT,
+            count=rnd.randint(1, 500),
+            company=rnd.choice(companies),
+        )
+        for _ in range(REPLIES)
+    ]
+
+    whole = timed(assistant.remote_synthesize, [str(reply) for reply in replies])
+    assistant.warm_speech_cache()
+    spliced = timed(assistant.synthesize, replies)
+    repeat = timed(assistant.synthesize, replies)
+
+    print(f"{REPLIES} replies like {replies[0]!r}")
+    print(f"{'whole':>8}: {whole:8.1f} ms/reply")
+    print(f"{'spliced':>8}: {spliced:8.1f} ms/reply")
+    print(f"{'repeat':>8}: {repeat:8.1f} ms/reply")
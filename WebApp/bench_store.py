@@ -0,0 +1,70 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+from store import UserStore
+
+# Compares the old per-request mask scan on /data with the UserStore dict hit
+# while the number of users and rows grows.
+SIZES = [(100, 10_000), (1_000, 100_000), (5_000, 500_000)]
+LOOKUPS = 200
+
+
+def synthesize(users, rows, seed=0):
+    rng = np.random.default_rng(seed)
+    user_ids = np.array([f"user-{i}" for i in range(users)])
+    trade = pd.DataFrame(
+        {
+            "userId": user_ids[rng.integers(0, users, rows)],
+            "executedAt": "2024-06-03 19:25:06.000",
+            "ISIN": "CA42249X1006",
+            "direction": rng.choice(["BUY", "SELL"], rows),
+            "executionSize": rng.random(rows) * 100,
+            "executionPrice": rng.random(rows) * 50,
+            "currency": "EUR",
+            "executionFee": 1.0,
+            "type": "REGULAR",
+        }
+    )
+    bank = pd.DataFrame(
+        {
+            "userId": user_ids[rng.integers(0, users, rows)],
+            "bookingDate": "2024-06-03",
+            "side": rng.choice(["CREDIT", "DEBIT"], rows),
+            "amount": rng.random(rows) * 200,
+            "currency": "EUR",
+            "type": "CARD",
+            "mcc": 5411.0,
+        }
+    )
+    return trade, bank, user_ids
+
+
+def mask_scan(trade, bank, user):
+    return {
+        "trade": trade[trade["userId"] == user].to_json(orient="records"),
+        "bank": bank[bank["userId"] == user].to_json(orient="records"),
+    }
+
+
+def timed(fn, users):
+    start = time.perf_counter()
+    for user in users:
+        fn(user)
+    return (time.perf_counter() - start) / len(users) * 1e6
+
+
+if __name__ == "__main__":
+    print(f"{'users':>8} {'rows':>10} {'build s':>8} {'scan us':>10} {'store us':>9}")
+    for users, rows in SIZES:
+        trade, bank, user_ids = synthesize(users, rows)
+        sample = user_ids[:LOOKUPS]
+
+        start = time.perf_counter()
+        store = UserStore(trade, bank)
+        build = time.perf_counter() - start
+
+        scan_us = timed(lambda u: mask_scan(trade, bank, u), sample)
+        store_us = timed(store.payload, sample)
+        print(f"{users:>8} {rows:>10} {build:>8.2f} {scan_us:>10.0f} {store_us:>9.2f}")
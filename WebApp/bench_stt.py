@@ -0,0 +1,73 @@
+import argparse
+import os
+import statistics
+import threading
+import time
+
+from openai import OpenAI
+
+import stt
+
+# Latency and throughput of the STT backends on recorded fixtures (any
+# format Whisper accepts: wav, webm, mp3, m4a). The remote path needs
+# OPENAI_API_KEY (and optionally OPENAI_BASE_URL); the local path needs
+# faster-whisper and the STT_LOCAL_MODEL weights.
+SESSIONS = [1, 4, 8]
+
+
+def load_fixtures(directory):
+    clips = []
+    for name in sorted(os.listdir(directory)):
+        with open(os.path.join(directory, name), "rb") as f:
+            clips.append((name, f.read()))
+    return clips
+
+
+def latency(transcriber, clips):
+    times = []
+    for name, audio in clips:
+        start = time.perf_counter()
+        transcriber.transcribe(audio, name)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times), max(times)
+
+
+# Each session transcribes every fixture once, one after the other
+def throughput(transcriber, clips, sessions):
+    def session():
+        for name, audio in clips:
+            transcriber.transcribe(audio, name)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=session) for _ in range(sessions)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sessions * len(clips) / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fixtures", required=True)
+    parser.add_argument("--backends", default="openai,local")
+    args = parser.parse_args()
+
+    clips = load_fixtures(args.fixtures)
+    print(f"{len(clips)} fixtures")
+    print(f"{'backend':>8} {'p50 s':>7} {'max s':>7}" + "".join(f" {f'{n} sess/s':>11}" for n in SESSIONS))
+    for backend in args.backends.split(","):
+        try:
+            start = time.perf_counter()
+            transcriber = stt.create_transcriber(OpenAI(), backend)
+            # First call pays for the model load / connection setup
+            name, audio = clips[0]
+            transcriber.transcribe(audio, name)
+            warmup = time.perf_counter() - start
+        except Exception as e:
+            print(f"{backend:>8} unavailable: {e}")
+            continue
+        p50, worst = latency(transcriber, clips)
+        rates = [throughput(transcriber, clips, n) for n in SESSIONS]
+        print(f"{backend:>8} {p50:>7.2f} {worst:>7.2f}" + "".join(f" {rate:>11.2f}" for rate in rates))
+        print(f"{'':>8} warm-up {warmup:.2f}s")
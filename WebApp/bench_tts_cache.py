@@ -0,0 +1,62 @@
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Time to audio for the static replies against a fake speech endpoint with
+# SPEECH_LATENCY per call: before warm-up (every phrase goes to the
+# endpoint), after warm-up (memory), and in a fresh process whose cache
+# only has the files on disk.
+STUB_PORT = 8993
+SPEECH_LATENCY = 0.3
+
+
+class StubSpeech(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        time.sleep(SPEECH_LATENCY)
+        audio = b"\xff\xfb" + body * 40
+        self.send_response(200)
+        self.send_header("Content-Type", "audio/mpeg")
+        self.send_header("Content-Length", str(len(audio)))
+        self.end_headers()
+        self.wfile.write(audio)
+
+    def log_message(self, *args):
+        pass
+
+
+def timed(synthesize, phrases):
+    start = time.perf_counter()
+    for phrase in phrases:
+        synthesize(phrase)
+    return (time.perf_counter() - start) / len(phrases) * 1000
+
+
+if __name__ == "__main__":
+    stub = ThreadingHTTPServer(("127.0.0.1", STUB_PORT), StubSpeech)
+    threading.Thread(target=stub.serve_forever, daemon=True).start()
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{STUB_PORT}/v1"
+    os.environ.setdefault("OPENAI_API_KEY", "stub")
+    directory = tempfile.mkdtemp()
+
+    import assistant
+    from tts_cache import SpeechCache
+
+    assistant.openai_client.get().api_key = os.environ["OPENAI_API_KEY"]
+    assistant.speech_cache = SpeechCache(directory)
+    phrases = assistant.STATIC_PHRASES
+
+    uncached = timed(assistant.remote_synthesize, phrases)
+    start = time.perf_counter()
+    assistant.warm_speech_cache()
+    warm_up = time.perf_counter() - start
+    memory = timed(assistant.synthesize, phrases)
+    assistant.speech_cache = SpeechCache(directory)
+    disk = timed(assistant.synthesize, phrases)
+
+    print(f"{len(phrases)} static replies, warm-up took {warm_up:.2f}s")
+    print(f"{'endpoint':>9}: {uncached:8.2f} ms/reply")
+    print(f"{'memory':>9}: {memory:8.3f} ms/reply")
+    print(f"{'disk':>9}: {disk:8.3f} ms/reply")
@@ -0,0 +1,206 @@
+import asyncio
+import json
+import multiprocessing
+import os
+import statistics
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import uvicorn
+import websockets
+
+# Load test for the async /voice pipeline. A local stub stands in for the
+# OpenAI transcription, chat and speech endpoints with fixed latencies; the
+# ASGI app runs in one uvicorn worker. Reports time-to-first-audio for the
+# buffered, streaming and WebSocket modes, then hits /voice with increasing
+# numbers of concurrent voice sessions.
+STUB_PORT = 8098
+APP_PORT = 8079
+LATENCY = {"transcriptions": 0.3, "completions": 0.5, "speech": 0.15}
+SPEECH_SECONDS_PER_CHAR = 0.004
+CONCURRENCY = [1, 8, 32, 64]
+ROUNDS = 2
+COMMAND = "tell me a joke"
+ANSWER = (
+    "Why did the stock cross the road? To get to the other side of the order book. "
+    "Honestly, that one was a bit of a bear market joke. "
+    "Ask me about your transactions if you want numbers instead of puns."
+)
+FAKE_MP3 = b"\xff\xf3" + b"\x00" * 4096
+FAKE_WEBM = b"\x1a\x45\xdf\xa3" + b"\x00" * 2048
+
+
+class StubServer(ThreadingHTTPServer):
+    request_queue_size = 256
+
+
+class StubOpenAI(BaseHTTPRequestHandler):
+    def read_body(self):
+        if self.headers.get("Transfer-Encoding") != "chunked":
+            return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        # Streamed uploads (/voice/ws) arrive chunked
+        body = b""
+        while size := int(self.rfile.readline().strip(), 16):
+            body += self.rfile.read(size)
+            self.rfile.readline()
+        self.rfile.readline()
+        return body
+
+    def do_POST(self):
+        body = self.read_body()
+        endpoint = self.path.rstrip("/").rsplit("/", 1)[-1]
+        time.sleep(LATENCY.get(endpoint, 0))
+        if endpoint == "speech":
+            # Synthesis time grows with the length of the text
+            time.sleep(len(json.loads(body)["input"]) * SPEECH_SECONDS_PER_CHAR)
+        if endpoint == "transcriptions":
+            self.reply(json.dumps({"text": COMMAND}).encode(), "application/json")
+        elif endpoint == "completions" and json.loads(body).get("stream"):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.end_headers()
+            for word in ANSWER.split(" "):
+                chunk = {
+                    "id": "stub",
+                    "object": "chat.completion.chunk",
+                    "created": 0,
+                    "model": "gpt-3.5-turbo",
+                    "choices": [{"index": 0, "delta": {"content": word + " "}, "finish_reason": None}],
+                }
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.write(b"data: [DONE]\n\n")
+        elif endpoint == "completions":
+            body = {
+                "id": "stub",
+                "object": "chat.completion",
+                "created": 0,
+                "model": "gpt-3.5-turbo",
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": ANSWER},
+                        "finish_reason": "stop",
+                    }
+                ],
+            }
+            self.reply(json.dumps(body).encode(), "application/json")
+        else:
+            self.reply(FAKE_MP3, "audio/mpeg")
+
+    def reply(self, data, content_type):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+async def voice_request(client, stream=False):
+    start = time.perf_counter()
+    response = await client.post(
+        f"http://127.0.0.1:{APP_PORT}/voice",
+        files={"audio": ("recording.webm", FAKE_WEBM, "audio/webm")},
+        data={"page_text": "Investments", "gen_z_mode": "false", "stream": "1" if stream else "0"},
+    )
+    response.raise_for_status()
+    return time.perf_counter() - start
+
+
+# Seconds until the first audio byte arrives, and until the reply is complete
+async def time_to_first_audio(stream):
+    async with httpx.AsyncClient(timeout=120) as client:
+        start = time.perf_counter()
+        async with client.stream(
+            "POST",
+            f"http://127.0.0.1:{APP_PORT}/voice",
+            files={"audio": ("recording.webm", FAKE_WEBM, "audio/webm")},
+            data={"page_text": "Investments", "gen_z_mode": "false", "stream": "1" if stream else "0"},
+        ) as response:
+            first = None
+            async for _ in response.aiter_bytes():
+                if first is None:
+                    first = time.perf_counter() - start
+        return first, time.perf_counter() - start
+
+
+# Simulates recording for RECORDING_SECONDS over /voice/ws, sending a frame
+# every FRAME_SECONDS. Returns seconds from "stop" to first audio and to the
+# end of the reply.
+RECORDING_SECONDS = 2.0
+FRAME_SECONDS = 0.25
+
+
+async def socket_session():
+    async with websockets.connect(f"ws://127.0.0.1:{APP_PORT}/voice/ws") as socket:
+        await socket.send(json.dumps({"page_text": "Investments", "gen_z_mode": "false"}))
+        frame = FAKE_WEBM[: len(FAKE_WEBM) // 8]
+        for _ in range(int(RECORDING_SECONDS / FRAME_SECONDS)):
+            await socket.send(frame)
+            await asyncio.sleep(FRAME_SECONDS)
+        start = time.perf_counter()
+        await socket.send("stop")
+        first = None
+        async for message in socket:
+            if isinstance(message, bytes):
+                first = first or time.perf_counter() - start
+            else:
+                assert json.loads(message).get("done"), message
+                break
+        return first, time.perf_counter() - start
+
+
+# Each simulated session sends ROUNDS voice requests back to back
+async def session(client):
+    return [await voice_request(client) for _ in range(ROUNDS)]
+
+
+async def load(concurrency):
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(timeout=120, limits=limits) as client:
+        start = time.perf_counter()
+        sessions = await asyncio.gather(*(session(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    latencies = [latency for session_latencies in sessions for latency in session_latencies]
+    return len(latencies) / elapsed, statistics.median(latencies), max(latencies)
+
+
+if __name__ == "__main__":
+    # The stub runs in its own process so it does not compete with the app
+    # for the GIL
+    stub = StubServer(("127.0.0.1", STUB_PORT), StubOpenAI)
+    multiprocessing.Process(target=stub.serve_forever, daemon=True).start()
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{STUB_PORT}/v1"
+    os.environ.setdefault("OPENAI_API_KEY", "stub")
+
+    from asgi import app
+    import assistant
+    from tts_cache import SpeechCache
+
+    # Measure the uncached speech path: a cache with no room keeps nothing
+    assistant.speech_cache = SpeechCache(tempfile.mkdtemp(), memory_bytes=0, disk_bytes=0)
+
+    server = uvicorn.Server(uvicorn.Config(app, port=APP_PORT, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+
+    for stream in (False, True):
+        first, total = asyncio.run(time_to_first_audio(stream))
+        label = "streaming" if stream else "buffered"
+        print(f"{label:>9}: first audio after {first:.2f}s, complete after {total:.2f}s")
+
+    first, total = asyncio.run(socket_session())
+    print(f"websocket: first audio {first:.2f}s after stop, complete after {total:.2f}s")
+
+    print(f"stage latencies: {LATENCY}")
+    print(f"{'concurrent':>10} {'req/s':>8} {'p50 s':>7} {'max s':>7}")
+    for concurrency in CONCURRENCY:
+        throughput, p50, worst = asyncio.run(load(concurrency))
+        print(f"{concurrency:>10} {throughput:>8.1f} {p50:>7.2f} {worst:>7.2f}")
+    server.should_exit = True
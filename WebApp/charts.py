@@ -0,0 +1,397 @@
+import re
+
+import pandas as pd
+
+# Declarative charts over the user's own rows. A prompt becomes a small spec
+# (source, metric, field, grouping, time bucket, filters, date range) either
+# through the rule-based parse_prompt or through the LLM; validate_spec
+# checks every field against a whitelist, and ChartEngine.run executes it
+# with vectorized pandas on the per-user partitions of UserStore and returns
+# the labels and values to draw. With rollups given, specs the rollup cubes
+# cover (see ROLLUP_FIELDS) are summed from pre-aggregated buckets instead.
+# netNotional and netSize count SELL rows negative, so their sums are what
+# is still held rather than what was traded.
+SOURCES = {
+    "bank": {
+        "date": "bookingDate",
+        "fields": ["amount"],
+        "groups": ["type", "side", "mcc"],
+        "filters": ["type", "side", "mcc"],
+    },
+    "trade": {
+        "date": "executedAt",
+        "fields": ["notional", "executionSize", "executionPrice", "executionFee", "netNotional", "netSize"],
+        "groups": ["direction", "type", "ISIN"],
+        "filters": ["direction", "type", "ISIN"],
+    },
+}
+METRICS = ["sum", "count", "mean"]
+BUCKETS = {"day": "D", "week": "W", "month": "M"}
+CHARTS = ["bar", "line", "pie"]
+MAX_LIMIT = 50
+DEFAULT_LIMIT = 10
+# Fields and columns kept in the rollup cubes, per source
+ROLLUP_FIELDS = {
+    "bank": ["amount"],
+    "trade": ["notional", "executionSize", "executionFee", "netNotional", "netSize"],
+}
+ROLLUP_COLUMNS = {
+    "bank": ["type", "side", "mcc"],
+    "trade": ["direction", "ISIN"],
+}
+
+MCC_NAMES = {
+    5411: "Groceries",
+    5422: "Butchers",
+    5451: "Dairy",
+    5462: "Bakeries",
+    5499: "Food stores",
+    5812: "Restaurants",
+    5813: "Bars",
+    5814: "Fast food",
+    5541: "Fuel",
+    5542: "Fuel",
+    5912: "Pharmacies",
+    5311: "Department stores",
+    5331: "Variety stores",
+    5651: "Clothing",
+    5691: "Clothing",
+    5999: "Retail",
+    5200: "Home supply",
+    5211: "Building materials",
+    5251: "Hardware",
+    5261: "Garden",
+    5712: "Furniture",
+    5932: "Antiques",
+    5533: "Auto parts",
+    5921: "Liquor stores",
+    5968: "Subscriptions",
+    5969: "Direct marketing",
+    5995: "Pet shops",
+    4111: "Transport",
+    4121: "Taxis",
+    4511: "Airlines",
+    7011: "Hotels",
+    4899: "Subscriptions",
+    6011: "Cash withdrawals",
+}
+
+# Prompt words -> merchant category codes
+MCC_KEYWORDS = [
+    (r"grocer|supermarket", [5411, 5422, 5451, 5499]),
+    (r"restaurant|dining|eating out|food", [5812, 5813, 5814]),
+    (r"bak", [5462]),
+    (r"fuel|petrol|gas station", [5541, 5542]),
+    (r"pharma|drug", [5912]),
+    (r"cloth|fashion", [5651, 5691]),
+    (r"shopping|retail", [5311, 5331, 5999]),
+    (r"travel|hotel|flight", [4511, 7011]),
+    (r"taxi|transport|commute", [4111, 4121]),
+    (r"subscription|streaming", [4899]),
+    (r"atm|cash withdrawal", [6011]),
+]
+
+
+SPEC_PROMPT = """Turn the user's chart request into a JSON chart spec. Reply with JSON only.
+Keys (omit what does not apply):
+  source: "bank" or "trade"
+  metric: "sum", "count" or "mean"
+  field: bank "amount"; trade "notional", "executionSize", "executionPrice", "executionFee",
+    "netNotional" or "netSize" (BUY minus SELL, for holdings and positions)
+  groupBy: bank "type", "side" or "mcc"; trade "direction", "type" or "ISIN"
+  bucket: "day", "week" or "month"
+  filters: object of column -> list of values; bank columns type (CARD, CARD_ORDER, EARNINGS,
+    INTEREST, OTHER, PAYIN, PAYOUT, TRADING), side (CREDIT, DEBIT), mcc (merchant category
+    codes, e.g. 5411 groceries, 5812 restaurants); trade columns direction (BUY, SELL), type
+    (REGULAR, SAVINGSPLAN, SAVEBACK, SPARECHANGE, BONUS), ISIN
+  since, until: ISO dates; today is {today}
+  chart: "bar", "line" or "pie"
+  limit: number of groups to keep (1-50)
+Spending means bank DEBIT rows."""
+
+
+class SpecError(ValueError):
+    pass
+
+
+def parse_prompt(prompt, today):
+    text = prompt.lower()
+    trade = re.search(
+        r"\b(trades?|trading|buys?|sells?|holdings?|invest\w*|stocks?|isin|positions?)\b", text
+    )
+    spec = {"source": "trade" if trade else "bank", "metric": "sum", "filters": {}}
+
+    if re.search(r"how many|number of|\bcount", text):
+        spec["metric"] = "count"
+    elif re.search(r"average|mean|typical", text):
+        spec["metric"] = "mean"
+
+    if spec["source"] == "bank":
+        spec["field"] = "amount"
+        if re.search(r"income|earn|received|deposit|credit|interest", text):
+            spec["filters"]["side"] = "CREDIT"
+        else:
+            spec["filters"]["side"] = "DEBIT"
+        codes = [code for pattern, group in MCC_KEYWORDS if re.search(pattern, text) for code in group]
+        if codes:
+            spec["filters"]["mcc"] = codes
+        elif spec["filters"]["side"] == "DEBIT" and re.search(r"spen[dt]|expense|card|purchase", text):
+            spec["filters"]["type"] = ["CARD", "CARD_ORDER"]
+        if re.search(r"by (merchant |spending )?categor|per categor|by mcc|breakdown", text):
+            spec["groupBy"] = "mcc"
+        elif re.search(r"by type|per type", text):
+            spec["groupBy"] = "type"
+    else:
+        spec["field"] = "executionSize" if re.search(r"shares|units|size", text) else "notional"
+        if re.search(r"holding|position", text):
+            spec["field"] = {"executionSize": "netSize", "notional": "netNotional"}[spec["field"]]
+        if re.search(r"buys? (and|vs\.?|versus) sells?|sells? (and|vs\.?|versus) buys?|direction", text):
+            spec["groupBy"] = "direction"
+        elif re.search(r"\bbuys?\b|bought", text):
+            spec["filters"]["direction"] = "BUY"
+        elif re.search(r"\bsells?\b|sold", text):
+            spec["filters"]["direction"] = "SELL"
+        if re.search(r"holding|position|isin|per stock|by stock|top \d+", text):
+            spec["groupBy"] = "ISIN"
+        elif re.search(r"savings ?plan|by type|per type", text):
+            spec["groupBy"] = "type"
+
+    if re.search(r"daily|per day|each day|by day", text):
+        spec["bucket"] = "day"
+    elif re.search(r"weekly|per week|each week|by week", text):
+        spec["bucket"] = "week"
+    elif re.search(r"monthly|per month|each month|by month|over time|trend|history", text):
+        spec["bucket"] = "month"
+
+    spec.update(parse_period(text, today))
+
+    top = re.search(r"top (\d+)", text)
+    if top:
+        spec["limit"] = int(top.group(1))
+
+    if "pie" in text:
+        spec["chart"] = "pie"
+    elif "line" in text or spec.get("bucket"):
+        spec["chart"] = "line"
+    else:
+        spec["chart"] = "bar"
+    if not spec.get("bucket") and not spec.get("groupBy"):
+        # A single number is not much of a chart; show it over the months
+        spec["bucket"] = "month"
+    return spec
+
+
+# Relative date phrases, resolved against the last day present in the data
+def parse_period(text, today):
+    today = pd.Timestamp(today).normalize()
+    month_start = today.replace(day=1)
+    day = pd.Timedelta(days=1)
+
+    def period(since, until):
+        return {"since": since.date().isoformat(), "until": until.date().isoformat()}
+
+    match = re.search(r"last (\d+) (day|week|month)s", text)
+    if match:
+        count, unit = int(match.group(1)), match.group(2)
+        return period(today - pd.DateOffset(**{unit + "s": count}) + day, today)
+    if "last month" in text or "previous month" in text:
+        return period(month_start - pd.DateOffset(months=1), month_start - day)
+    if "this month" in text:
+        return period(month_start, today)
+    if "last week" in text:
+        return period(today - 6 * day, today)
+    return {}
+
+
+def validate_spec(spec):
+    if not isinstance(spec, dict):
+        raise SpecError("spec must be an object")
+    source = spec.get("source", "bank")
+    if source not in SOURCES:
+        raise SpecError(f"unknown source {source!r}")
+    allowed = SOURCES[source]
+
+    clean = {"source": source}
+    clean["metric"] = spec.get("metric", "sum")
+    if clean["metric"] not in METRICS:
+        raise SpecError(f"unknown metric {clean['metric']!r}")
+    clean["field"] = spec.get("field", allowed["fields"][0])
+    if clean["field"] not in allowed["fields"]:
+        raise SpecError(f"field {clean['field']!r} not available for {source}")
+    clean["groupBy"] = spec.get("groupBy")
+    if clean["groupBy"] is not None and clean["groupBy"] not in allowed["groups"]:
+        raise SpecError(f"cannot group {source} by {clean['groupBy']!r}")
+    clean["bucket"] = spec.get("bucket")
+    if clean["bucket"] is not None and clean["bucket"] not in BUCKETS:
+        raise SpecError(f"unknown bucket {clean['bucket']!r}")
+    clean["chart"] = spec.get("chart", "bar")
+    if clean["chart"] not in CHARTS:
+        raise SpecError(f"unknown chart {clean['chart']!r}")
+
+    limit = spec.get("limit", DEFAULT_LIMIT)
+    if not isinstance(limit, int) or not 1 <= limit <= MAX_LIMIT:
+        raise SpecError(f"limit must be between 1 and {MAX_LIMIT}")
+    clean["limit"] = limit
+
+    filters = spec.get("filters") or {}
+    if not isinstance(filters, dict):
+        raise SpecError("filters must be an object")
+    clean["filters"] = {}
+    for column, values in filters.items():
+        if column not in allowed["filters"]:
+            raise SpecError(f"cannot filter {source} on {column!r}")
+        values = values if isinstance(values, list) else [values]
+        if column == "mcc":
+            try:
+                values = [int(value) for value in values]
+            except (TypeError, ValueError):
+                raise SpecError("mcc filters must be numbers")
+        elif not all(isinstance(value, str) for value in values):
+            raise SpecError(f"{column} filters must be strings")
+        clean["filters"][column] = values
+
+    for key in ("since", "until"):
+        if spec.get(key) is not None:
+            try:
+                clean[key] = pd.Timestamp(spec[key]).date().isoformat()
+            except (TypeError, ValueError):
+                raise SpecError(f"{key} must be a date")
+    return clean
+
+
+def label(column, value):
+    if column == "mcc":
+        return MCC_NAMES.get(int(value), str(int(value)))
+    return str(value)
+
+
+def field_values(frame, field):
+    if field in ("notional", "netNotional"):
+        values = frame["executionSize"] * frame["executionPrice"]
+    else:
+        values = frame["executionSize" if field == "netSize" else field].astype("float64")
+    if field in ("netNotional", "netSize"):
+        values = values.where(frame["direction"] != "SELL", -values)
+    return values
+
+
+class ChartEngine:
+    def __init__(self, store, today, rollups=None):
+        self.store = store
+        self.today = today
+        self.rollups = rollups
+
+    # Spec for a prompt from the LLM when one is given, else from the rules;
+    # an unusable LLM answer falls back to the rules
+    def spec_for(self, prompt, ask_llm=None):
+        if ask_llm is not None:
+            try:
+                return validate_spec(ask_llm(SPEC_PROMPT.format(today=self.today.date().isoformat()), prompt))
+            except Exception as e:
+                print(f"LLM chart spec rejected, using rules: {e}")
+        return validate_spec(parse_prompt(prompt, self.today))
+
+    def rows(self, source, user_id):
+        partitions = self.store.trade if source == "trade" else self.store.bank
+        return partitions.get(user_id)
+
+    def from_rollups(self, spec):
+        if self.rollups is None or spec["field"] not in ROLLUP_FIELDS[spec["source"]]:
+            return False
+        columns = ROLLUP_COLUMNS[spec["source"]]
+        return (spec["groupBy"] is None or spec["groupBy"] in columns) and all(
+            column in columns for column in spec["filters"]
+        )
+
+    # The metric per bucket and/or group from the raw rows; None when no row
+    # matches
+    def table_from_rows(self, spec, user_id):
+        frame = self.rows(spec["source"], user_id)
+        if frame is None or frame.empty:
+            return None
+        source = SOURCES[spec["source"]]
+        dates = frame[source["date"]]
+
+        mask = pd.Series(True, index=frame.index)
+        for column, values in spec["filters"].items():
+            mask &= frame[column].isin(values)
+        if "since" in spec:
+            mask &= dates >= pd.Timestamp(spec["since"])
+        if "until" in spec:
+            mask &= dates < pd.Timestamp(spec["until"]) + pd.Timedelta(days=1)
+        frame = frame[mask]
+        if frame.empty:
+            return None
+
+        values = field_values(frame, spec["field"])
+
+        keys = []
+        if spec["bucket"]:
+            period = BUCKETS[spec["bucket"]]
+            keys.append(frame[source["date"]].dt.to_period(period).dt.start_time.rename("bucket"))
+        if spec["groupBy"]:
+            keys.append(frame[spec["groupBy"]])
+        if not keys:
+            keys.append(pd.Series("total", index=frame.index, name="total"))
+        return values.groupby(keys, observed=True).agg(spec["metric"])
+
+    # Same table summed from the rollup buckets
+    def table_from_rollups(self, spec, user_id):
+        rollup = self.rollups.trade if spec["source"] == "trade" else self.rollups.bank
+        sums = rollup.query(
+            user_id,
+            spec.get("since"),
+            spec.get("until"),
+            spec["filters"],
+            spec["groupBy"],
+            spec["bucket"],
+        )
+        if not sums["count"].sum():
+            return None
+        if spec["metric"] == "count":
+            values = sums["count"]
+        elif spec["metric"] == "mean":
+            values = sums[spec["field"]] / sums["count"]
+        else:
+            values = sums[spec["field"]]
+
+        keys = []
+        if spec["bucket"]:
+            keys.append(pd.Index(sums["bucket"], name="bucket"))
+        if spec["groupBy"]:
+            keys.append(pd.Index(sums[spec["groupBy"]], name=spec["groupBy"]))
+        if not keys:
+            return pd.Series(values, index=pd.Index(["total"], name="total"))
+        table = pd.Series(values, index=pd.MultiIndex.from_arrays(keys) if len(keys) > 1 else keys[0])
+        if spec["groupBy"] == "mcc":
+            # Rows without a category are not a group of their own
+            table = table[table.index.get_level_values("mcc") != -1]
+        return table.sort_index()
+
+    def run(self, spec, user_id):
+        result = {"spec": spec, "labels": [], "series": []}
+        if self.from_rollups(spec):
+            table = self.table_from_rollups(spec, user_id)
+        else:
+            table = self.table_from_rows(spec, user_id)
+        if table is None:
+            return result
+
+        if spec["bucket"] and spec["groupBy"]:
+            table = table.unstack(fill_value=0)
+            top = table.sum().nlargest(spec["limit"]).index
+            table = table[top]
+            result["labels"] = [stamp.date().isoformat() for stamp in table.index]
+            result["series"] = [
+                {"name": label(spec["groupBy"], name), "values": [round(float(v), 2) for v in table[name]]}
+                for name in table.columns
+            ]
+        elif spec["bucket"]:
+            result["labels"] = [stamp.date().isoformat() for stamp in table.index]
+            result["series"] = [{"name": spec["metric"], "values": [round(float(v), 2) for v in table]}]
+        else:
+            table = table.nlargest(spec["limit"])
+            column = spec["groupBy"] or "total"
+            result["labels"] = [label(column, value) for value in table.index]
+            result["series"] = [{"name": spec["metric"], "values": [round(float(v), 2) for v in table]}]
+        return result
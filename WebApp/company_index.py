@@ -0,0 +1,171 @@
+import heapq
+import math
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from fuzzywuzzy import process
+
+# Trigrams shared by more than this share of the vocabulary carry almost no
+# signal for blocking ("inc", "ltd", ...) and are skipped
+COMMON_GRAM_SHARE = 0.05
+FUZZY_CANDIDATES = 32
+# Distinct queries whose matches are remembered, least recently used first out
+MATCH_CACHE_SIZE = 4096
+
+
+def trigrams(text):
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+# Company lookups built once at load time. Queries keep the old
+# str.contains(company.lower()) semantics: every company whose lowercased
+# name contains the query counts as a match.
+class CompanyIndex:
+    def __init__(self, df):
+        self.df = df
+        names = df["CompanyName"].str.lower()
+
+        # Normalized name -> row positions
+        self.rows = names.groupby(names, sort=False).indices
+
+        # Normalized name -> (rows, non-null prices, price sum)
+        stats = df["executionPrice"].groupby(names, sort=False).agg(["size", "count", "sum"])
+        self.stats = {
+            name: (int(size), int(count), float(total))
+            for name, size, count, total in stats.itertuples()
+        }
+
+        # Normalized name -> (executedAt, row position) of first and last trade
+        frame = pd.DataFrame({"name": names.to_numpy(), "at": df["executedAt"].to_numpy()})
+        ordered = frame.dropna().sort_values("at", kind="mergesort")
+        first = ordered.drop_duplicates("name", keep="first")
+        last = ordered.drop_duplicates("name", keep="last")
+        self.first = {name: (at, pos) for pos, name, at in first.itertuples()}
+        self.last = {name: (at, pos) for pos, name, at in last.itertuples()}
+
+        # Trigram -> names containing it, used to narrow substring queries
+        self.grams = {}
+        for name in self.rows:
+            for gram in trigrams(name):
+                self.grams.setdefault(gram, set()).add(name)
+
+        self.lock = threading.Lock()
+        self.matches = OrderedDict()
+        self.idf = {}
+        self.refresh_idf()
+
+    # Index rows appended to the frame: df is the whole new frame and the rows
+    # from position start on are new. The frame is swapped in before the
+    # lookups that point into it, and each lookup dict is replaced whole, so
+    # a reader never follows a position the frame it sees does not have.
+    def append(self, df, start):
+        new = df.iloc[start:]
+        names = new["CompanyName"].str.lower()
+        self.df = df
+
+        rows = dict(self.rows)
+        for name, positions in names.groupby(names, sort=False).indices.items():
+            positions = positions + start
+            rows[name] = np.concatenate([rows[name], positions]) if name in rows else positions
+
+        stats = dict(self.stats)
+        added = new["executionPrice"].groupby(names, sort=False).agg(["size", "count", "sum"])
+        for name, size, count, total in added.itertuples():
+            old_size, old_count, old_total = stats.get(name, (0, 0, 0.0))
+            stats[name] = (old_size + int(size), old_count + int(count), old_total + float(total))
+
+        # Ties keep the earliest row for first and the latest row for last,
+        # as the stable sort in __init__ does
+        first = dict(self.first)
+        last = dict(self.last)
+        frame = pd.DataFrame({"name": names.to_numpy(), "at": new["executedAt"].to_numpy()}).dropna()
+        ordered = frame.sort_values("at", kind="mergesort")
+        for pos, name, at in ordered.drop_duplicates("name", keep="first").itertuples():
+            if name not in first or at < first[name][0]:
+                first[name] = (at, pos + start)
+        for pos, name, at in ordered.drop_duplicates("name", keep="last").itertuples():
+            if name not in last or at >= last[name][0]:
+                last[name] = (at, pos + start)
+
+        grams = dict(self.grams)
+        fresh = [name for name in rows if name not in self.rows]
+        for name in fresh:
+            for gram in trigrams(name):
+                grams[gram] = grams.get(gram, set()) | {name}
+
+        self.rows, self.stats, self.first, self.last, self.grams = rows, stats, first, last, grams
+        if fresh:
+            self.refresh_idf()
+        self.matches = OrderedDict()
+
+    def refresh_idf(self):
+        total = len(self.rows)
+        limit = max(COMMON_GRAM_SHARE * total, 50)
+        self.idf = {
+            gram: math.log(total / len(names))
+            for gram, names in self.grams.items()
+            if len(names) <= limit
+        }
+
+    def match(self, company):
+        query = company.lower()
+        # An append swaps in an empty cache; an answer computed from the old
+        # lookups must not land in the new one
+        matches = self.matches
+        with self.lock:
+            if query in matches:
+                matches.move_to_end(query)
+                return matches[query]
+
+        if len(query) < 3:
+            candidates = self.rows.keys()
+        else:
+            sets = sorted((self.grams.get(gram, set()) for gram in trigrams(query)), key=len)
+            candidates = set.intersection(*sets)
+        names = tuple(name for name in candidates if query in name)
+        with self.lock:
+            matches[query] = names
+            while len(matches) > MATCH_CACHE_SIZE:
+                matches.popitem(last=False)
+        return names
+
+    def count(self, company):
+        return sum(self.stats[name][0] for name in self.match(company))
+
+    def total(self, company):
+        return sum(self.stats[name][2] for name in self.match(company))
+
+    def mean(self, company):
+        names = self.match(company)
+        count = sum(self.stats[name][1] for name in names)
+        if not count:
+            return np.nan
+        return sum(self.stats[name][2] for name in names) / count
+
+    def first_transaction(self, company):
+        found = [self.first[name] for name in self.match(company) if name in self.first]
+        return self.df.iloc[[min(found)[1]] if found else []]
+
+    def last_transaction(self, company):
+        found = [self.last[name] for name in self.match(company) if name in self.last]
+        return self.df.iloc[[max(found)[1]] if found else []]
+
+    def fuzzy_match(self, query, limit=FUZZY_CANDIDATES):
+        # Trigram blocking: score each distinct name by the idf-weighted
+        # trigrams it shares with the query, then run the exact fuzzywuzzy
+        # scorer only on the best few candidates
+        scores = {}
+        for gram in trigrams(query.lower()):
+            weight = self.idf.get(gram)
+            if weight is None:
+                continue
+            for name in self.grams[gram]:
+                scores[name] = scores.get(name, 0.0) + weight
+        # Queries too short for a trigram, or made only of common ones, get
+        # the old scan over every distinct name
+        if not scores:
+            return process.extractOne(query, list(self.rows))
+        candidates = heapq.nlargest(limit, scores, key=scores.get)
+        return process.extractOne(query, candidates)
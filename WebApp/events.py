@@ -0,0 +1,199 @@
+import fcntl
+import io
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+import pandas as pd
+
+import ingest
+
+# Append-only trade and bank events. They arrive as JSON rows posted to
+# /events/<kind> or as lines appended to a CSV file that tail() follows, and
+# become frames typed like the ones ingest.load returns. Trade events may
+# carry a CompanyName, which also feeds the assistant's company index.
+COLUMNS = {
+    "trade": [
+        "userId",
+        "executedAt",
+        "ISIN",
+        "direction",
+        "executionSize",
+        "executionPrice",
+        "currency",
+        "executionFee",
+        "type",
+    ],
+    "bank": ["userId", "bookingDate", "side", "amount", "currency", "type", "mcc"],
+}
+OPTIONAL = ["mcc", "CompanyName"]
+NUMBERS = ["executionSize", "executionPrice", "executionFee", "amount", "mcc"]
+# Identifiers and enums are strings whatever the JSON had: the loaded frames
+# and every lookup key users and ISINs by string
+TEXT = ["userId", "ISIN", "currency", "CompanyName", "direction", "side", "type"]
+# Values the rest of the app knows how to handle (those in trade.csv and
+# bank.csv)
+ALLOWED = {
+    "trade": {
+        "direction": ["BUY", "SELL"],
+        "type": ["REGULAR", "SAVINGSPLAN", "SAVEBACK", "SPARECHANGE", "BONUS"],
+    },
+    "bank": {
+        "side": ["CREDIT", "DEBIT"],
+        "type": ["CARD", "CARD_ORDER", "EARNINGS", "INTEREST", "OTHER", "PAYIN", "PAYOUT", "TRADING"],
+    },
+}
+POSITIVE = ["executionSize", "executionPrice", "amount"]
+TAIL_INTERVAL = float(os.environ.get("EVENTS_TAIL_INTERVAL", "1.0"))
+
+
+class EventError(ValueError):
+    pass
+
+
+# JSON rows (an object or a list of objects) or a parsed CSV chunk -> typed
+# frame with the columns of the kind's CSV
+def to_frame(records, kind):
+    if kind not in COLUMNS:
+        raise EventError(f"unknown event kind {kind!r}")
+    if isinstance(records, pd.DataFrame):
+        frame = records
+    else:
+        if isinstance(records, dict):
+            records = [records]
+        if not isinstance(records, list) or not all(isinstance(record, dict) for record in records):
+            raise EventError("events must be an object or a list of objects")
+        frame = pd.DataFrame.from_records(records)
+
+    columns = COLUMNS[kind] + [column for column in OPTIONAL if column in frame and column not in COLUMNS[kind]]
+    missing = [column for column in COLUMNS[kind] if column not in frame and column not in OPTIONAL]
+    if missing:
+        raise EventError(f"{kind} events need {', '.join(missing)}")
+    frame = frame.reindex(columns=columns)
+    required = [column for column in columns if column not in OPTIONAL]
+    if frame[required].isna().any().any():
+        raise EventError(f"{kind} events need values for {', '.join(required)}")
+
+    for column in TEXT:
+        if column in frame:
+            frame[column] = frame[column].where(frame[column].isna(), frame[column].astype(str))
+    for column, allowed in ALLOWED[kind].items():
+        unknown = sorted(set(frame[column]) - set(allowed))
+        if unknown:
+            raise EventError(f"{column} must be one of {', '.join(allowed)}, not {', '.join(unknown)}")
+
+    for column in ingest.DATES:
+        if column in frame:
+            # Offsets are converted to UTC and dropped: the loaded frames
+            # hold naive timestamps, which cannot be compared with aware ones
+            dates = pd.to_datetime(frame[column], format="ISO8601", errors="coerce", utc=True)
+            if dates.isna().any():
+                raise EventError(f"{column} must be an ISO 8601 date")
+            frame[column] = dates.dt.tz_convert(None)
+    try:
+        for column in NUMBERS:
+            if column in frame:
+                frame[column] = pd.to_numeric(frame[column]).astype(np.float64)
+    except (TypeError, ValueError) as e:
+        raise EventError(str(e))
+    for column in POSITIVE:
+        if column in frame and not (frame[column] > 0).all():
+            raise EventError(f"{column} must be positive")
+    if "executionFee" in frame and (frame["executionFee"] < 0).any():
+        raise EventError("executionFee must not be negative")
+    if "mcc" in frame:
+        mcc = frame["mcc"].dropna()
+        if not ((mcc % 1 == 0) & (mcc >= 0) & (mcc <= 9999)).all():
+            raise EventError("mcc must be a four-digit merchant category code")
+    return ingest.typed(frame)
+
+
+# Appends from concurrent requests are applied together: while one batch is
+# being applied, newer events queue up and go in as the next batch, so the
+# fixed cost of an update is shared once events arrive faster than that.
+# apply(trade=..., bank=...) folds typed frames into the live structures.
+class EventWriter:
+    def __init__(self, apply):
+        self.apply = apply
+        self.requests = queue.Queue()
+        threading.Thread(target=self.run, daemon=True).start()
+
+    # Returns once the rows are visible to readers
+    def append(self, kind, rows):
+        future = Future()
+        self.requests.put((kind, rows, future))
+        return future.result()
+
+    def run(self):
+        while True:
+            batch = [self.requests.get()]
+            while True:
+                try:
+                    batch.append(self.requests.get_nowait())
+                except queue.Empty:
+                    break
+
+            parts = {}
+            for kind, rows, _ in batch:
+                parts.setdefault(kind, []).append(rows)
+            try:
+                self.apply(**{kind: ingest.concat(frames) for kind, frames in parts.items()})
+            except Exception as e:
+                for _, _, future in batch:
+                    future.set_exception(e)
+                continue
+            for _, _, future in batch:
+                future.set_result(len(batch))
+
+
+# Append typed rows to a CSV file in the column order of its header. The
+# lines go out in one write under an exclusive lock, so a tail never sees
+# rows from two writers interleaved. Columns the file does not have (a
+# trade's CompanyName) are dropped.
+def append_csv(path, rows):
+    with open(path, "rb") as file:
+        header = file.readline().decode().strip().split(",")
+    lines = rows.reindex(columns=header).to_csv(header=False, index=False).encode()
+    with open(path, "ab") as file:
+        fcntl.flock(file, fcntl.LOCK_EX)
+        try:
+            file.write(lines)
+            file.flush()
+        finally:
+            fcntl.flock(file, fcntl.LOCK_UN)
+
+
+# Follow a CSV file other processes append to, like tail -f: complete new
+# lines are parsed against the file's header and handed to handle as one
+# typed frame per poll. Starts at offset, the end of the part of the file
+# already loaded (ingest.load_at), or else at the current end of the file.
+def tail(path, kind, handle, interval=TAIL_INTERVAL, offset=None):
+    def follow():
+        with open(path, "rb") as file:
+            header = file.readline()
+        position = os.path.getsize(path) if offset is None else offset
+        pending = b""
+        while True:
+            time.sleep(interval)
+            try:
+                with open(path, "rb") as file:
+                    file.seek(position)
+                    data = file.read()
+            except OSError as e:
+                print(f"Cannot read {path}: {e}")
+                continue
+            position += len(data)
+            lines, _, pending = (pending + data).rpartition(b"\n")
+            if not lines:
+                continue
+            try:
+                handle(to_frame(pd.read_csv(io.BytesIO(header + lines + b"\n")), kind))
+            except Exception as e:
+                print(f"Skipped new lines of {path}: {e}")
+
+    thread = threading.Thread(target=follow, daemon=True)
+    thread.start()
+    return thread
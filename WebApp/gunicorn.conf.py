@@ -0,0 +1,58 @@
+import gc
+import multiprocessing
+import os
+
+# Production serving: gunicorn runs N uvicorn worker processes, all forked
+# from a master that has already imported the app and built the data,
+# indexes and spaCy model, so the workers share those pages copy-on-write.
+# The trade and bank frames come from memory-mapped Feather snapshots, so
+# their numeric columns are shared through the page cache as well.
+#
+#   cd WebApp && gunicorn -c gunicorn.conf.py
+#
+# WEB_CONCURRENCY sets the number of workers (default: one per core).
+wsgi_app = "asgi:app"
+bind = f"0.0.0.0:{os.environ.get('PORT', '8078')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+# The app reads it too: /events behaves differently with several workers
+os.environ["WEB_CONCURRENCY"] = str(workers)
+worker_class = "uvicorn_worker.UvicornWorker"
+preload_app = True
+timeout = 120
+
+# No collections in the master: a collection writes to the header of every
+# tracked object, which would un-share its page in every worker
+gc.disable()
+
+
+def when_ready(server):
+    import assistant
+    import lazy
+
+    # Build the data, indexes and models before the first fork rather than
+    # once per worker. Network clients are left to the workers: their pooled
+    # keep-alive sockets must not be shared between processes.
+    lazy.prewarm(clients=False)
+    if assistant.speech_warmup is not None:
+        assistant.speech_warmup.join()
+
+    # Objects created so far go to the permanent generation; the workers'
+    # collector never scans them, so their pages stay shared
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    import lazy
+    import quotes
+    import requests
+
+    gc.enable()
+    # The phrase cache warm-up made its requests from the master; start over
+    # with clients and a quote session of this worker's own
+    lazy.reset_clients()
+    quotes.session = requests.Session()
+    lazy.start_prewarm()
+    if os.environ.get("TAIL_EVENTS") == "1":
+        import back
+
+        back.start_tail()
@@ -0,0 +1,108 @@
+import io
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+# Typed loading of the trade and bank CSVs. Repeated strings (user ids,
+# ISINs, company names, enums) become categoricals, timestamps are parsed to
+# datetime64, and small exact values use float32; prices and amounts stay
+# float64. The typed frame is saved as an uncompressed Feather snapshot next
+# to the CSV and later startups memory-map it instead of parsing the CSV.
+# A snapshot older than its CSV is rebuilt.
+SNAPSHOT_VERSION = 1
+
+CATEGORIES = ["userId", "ISIN", "CompanyName", "direction", "currency", "type", "side"]
+FLOAT32 = ["executionFee", "mcc"]
+DATES = ["executedAt", "bookingDate"]
+
+
+def snapshot_path(csv_path):
+    return f"{os.path.splitext(csv_path)[0]}.v{SNAPSHOT_VERSION}.feather"
+
+
+def read_typed_csv(path):
+    columns = pd.read_csv(path, nrows=0).columns
+    if hasattr(path, "seek"):
+        path.seek(0)
+    dtype = {column: "category" for column in CATEGORIES if column in columns}
+    dtype.update({column: "float32" for column in FLOAT32 if column in columns})
+    df = pd.read_csv(path, dtype=dtype)
+    for column in DATES:
+        if column in columns:
+            df[column] = pd.to_datetime(df[column], format="ISO8601")
+    return df
+
+
+# The same dtypes for rows that did not come from a CSV file (appended events)
+def typed(df):
+    for column in CATEGORIES:
+        if column in df:
+            df[column] = df[column].astype("category")
+    for column in FLOAT32:
+        if column in df:
+            df[column] = df[column].astype("float32")
+    for column in DATES:
+        if column in df:
+            df[column] = pd.to_datetime(df[column], format="ISO8601")
+    return df
+
+
+# pd.concat turns categoricals with different categories into object
+# columns; give every frame the union of the categories first
+def concat(frames):
+    frames = [frame.copy(deep=False) for frame in frames]
+    for column in CATEGORIES:
+        if not all(column in frame and isinstance(frame[column].dtype, pd.CategoricalDtype) for frame in frames):
+            continue
+        categories = frames[0][column].cat.categories
+        for frame in frames[1:]:
+            categories = categories.append(frame[column].cat.categories.difference(categories))
+        for frame in frames:
+            if not frame[column].cat.categories.equals(categories):
+                frame[column] = frame[column].cat.set_categories(categories)
+    return pd.concat(frames, ignore_index=True)
+
+
+def write_snapshot(df, path):
+    # Write then rename so a concurrent reader never maps a partial file
+    temp = f"{path}.{os.getpid()}.tmp"
+    feather.write_feather(df, temp, compression="uncompressed")
+    os.replace(temp, path)
+
+
+def read_snapshot(path):
+    # Numeric columns without nulls stay views onto the mapped file
+    return feather.read_table(path, memory_map=True).to_pandas(split_blocks=True)
+
+
+def load(csv_path):
+    return load_at(csv_path)[0]
+
+
+# The frame and the byte offset of the CSV it covers, for following rows
+# appended to the file later. Only the complete lines present when loading
+# starts are parsed, so a row appended meanwhile lies past the offset rather
+# than being read twice or missed.
+def load_at(csv_path):
+    size = os.path.getsize(csv_path)
+    snapshot = snapshot_path(csv_path)
+    try:
+        if os.path.getmtime(snapshot) >= os.path.getmtime(csv_path):
+            return read_snapshot(snapshot), size
+    except (OSError, pa.ArrowException):
+        pass
+
+    with open(csv_path, "rb") as file:
+        data = file.read(size)
+    data = data[: data.rfind(b"\n") + 1]
+    df = read_typed_csv(io.BytesIO(data))
+    # A snapshot stands for the whole file, so none is written for a file
+    # that grew or ended in a partial line while it was read
+    if len(data) == size == os.path.getsize(csv_path):
+        try:
+            write_snapshot(df, snapshot)
+        except (OSError, pa.ArrowException) as e:
+            print(f"Could not write snapshot {snapshot}: {e}")
+    return df, len(data)
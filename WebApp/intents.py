@@ -0,0 +1,104 @@
+import re
+
+SYNONYMS = {
+    "price": ["price", "cost", "worth", "value"],
+    "stock": ["stock", "share"],
+    "transaction": ["transaction", "txn", "deal", "operation"],
+    "company": ["company", "business", "firm"],
+    "list": ["list", "show", "display"],
+    "average": ["average", "mean"],
+    "total": ["total", "sum"],
+    "exit": ["exit", "stop", "quit", "leave"],
+    "help": ["help", "assist", "support"],
+}
+
+
+def expand_pattern(pattern):
+    expanded = []
+    for word in pattern:
+        expanded.append(SYNONYMS.get(word, [word]))
+    return expanded
+
+
+# Patterns use keywords, not synonyms directly
+INTENT_PATTERNS = {
+    "stock_price": [
+        ["stock", "price"],
+        ["how", "much", "stock", "cost"],
+        ["how", "much", "is", "stock"],
+        ["how", "much", "is", "the", "stock"],
+    ],
+    "top_company": [["most", "transactions"], ["top", "company"]],
+    "last_transaction": [["last", "transaction"]],
+    "first_transaction": [["first", "transaction"]],
+    "transaction_count": [["how", "many"], ["number", "transactions"]],
+    "total_value": [["total", "value"], ["total", "worth"]],
+    "average_value": [["average", "value"], ["average", "transaction"]],
+    "list_companies": [["list", "companies"], ["show", "companies"]],
+    "transaction_types": [["transaction", "types"], ["types", "of", "transactions"]],
+    "help": [["help"], ["what", "can", "you", "do"]],
+    "exit": [["stop"], ["exit"], ["enough"]],
+}
+
+
+def preprocess_command(command):
+    command = command.lower()
+    command = re.sub(r"[^\w\s]", "", command)
+    return command.split()
+
+
+# Reference matcher: expands every pattern with synonyms per call. Kept as
+# the definition of intent semantics that the compiled table must reproduce.
+def match_pattern(command_words, pattern):
+    # Expand pattern with synonyms
+    expanded = expand_pattern(pattern)
+    for synonym_group in expanded:
+        if not any(word in command_words for word in synonym_group):
+            return False
+    return True
+
+
+def detect_intent_reference(command):
+    command_words = preprocess_command(command)
+
+    for intent, patterns in INTENT_PATTERNS.items():
+        for pattern in patterns:
+            if match_pattern(command_words, pattern):
+                return intent
+
+    return "unknown"
+
+
+# Compile patterns and synonyms once: every (intent, pattern, slot) gets one
+# bit, and each word maps to the bits of all slots it satisfies. A pattern
+# matches when the words of the command cover all of its slot bits.
+def compile_patterns():
+    token_masks = {}
+    pattern_masks = []
+    bit = 0
+    for intent, patterns in INTENT_PATTERNS.items():
+        for pattern in patterns:
+            mask = 0
+            for synonym_group in expand_pattern(pattern):
+                for word in synonym_group:
+                    token_masks[word] = token_masks.get(word, 0) | (1 << bit)
+                mask |= 1 << bit
+                bit += 1
+            pattern_masks.append((intent, mask))
+    return token_masks, pattern_masks
+
+
+TOKEN_MASKS, PATTERN_MASKS = compile_patterns()
+
+
+def detect_intent(command):
+    seen = 0
+    for word in set(preprocess_command(command)):
+        seen |= TOKEN_MASKS.get(word, 0)
+
+    # Patterns stay in INTENT_PATTERNS order, so priority is unchanged
+    for intent, mask in PATTERN_MASKS:
+        if seen & mask == mask:
+            return intent
+
+    return "unknown"
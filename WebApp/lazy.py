@@ -0,0 +1,94 @@
+import threading
+import time
+
+# Heavy resources (clients, models, data) are built on first use instead of
+# at import, so the server binds its port right away. Named resources are
+# registered for the readiness check and for pre-warming. Clients (client=True)
+# hold pooled network connections, which must not be shared across a fork.
+resources = {}
+
+
+class Lazy:
+    def __init__(self, factory, name=None, client=False):
+        self.factory = factory
+        self.name = name
+        self.client = client
+        self.lock = threading.Lock()
+        self.value = None
+        self.ready = False
+        self.error = None
+        if name:
+            resources[name] = self
+
+    def get(self):
+        if not self.ready:
+            with self.lock:
+                if not self.ready:
+                    try:
+                        self.value = self.factory()
+                    except Exception as e:
+                        self.error = str(e)
+                        raise
+                    self.error = None
+                    self.ready = True
+        return self.value
+
+    # Replace the value without running the factory (benchmarks, tests)
+    def set(self, value):
+        with self.lock:
+            self.value = value
+            self.ready = True
+            self.error = None
+
+    # Drop the value; the next get builds a new one
+    def reset(self):
+        with self.lock:
+            self.value = None
+            self.ready = False
+            self.error = None
+
+
+def status():
+    report = {}
+    for name, resource in resources.items():
+        if resource.ready:
+            report[name] = "ready"
+        elif resource.error:
+            report[name] = f"error: {resource.error}"
+        else:
+            report[name] = "pending"
+    return report
+
+
+def all_ready():
+    return all(resource.ready for resource in resources.values())
+
+
+# Build every registered resource (clients=False: all but the clients),
+# logging failures instead of raising so one broken dependency does not stop
+# the rest from warming up
+def prewarm(clients=True):
+    for name, resource in list(resources.items()):
+        if resource.client and not clients:
+            continue
+        start = time.perf_counter()
+        try:
+            resource.get()
+        except Exception as e:
+            print(f"Pre-warm of {name} failed: {e}")
+            continue
+        print(f"Pre-warmed {name} in {time.perf_counter() - start:.2f}s")
+
+
+# In a forked child: forget the clients inherited from the parent, so each
+# process opens its own connections
+def reset_clients():
+    for resource in resources.values():
+        if resource.client:
+            resource.reset()
+
+
+def start_prewarm():
+    thread = threading.Thread(target=prewarm, daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,103 @@
+import importlib.util
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+
+import numpy as np
+
+# Cache for /plot. Mistral runs at temperature 0, so the generated code only
+# depends on the topic. Topics are normalized (case, spacing, trailing
+# punctuation) for an exact tier; with sentence-transformers installed a
+# semantic tier also serves a topic whose embedding is within
+# SEMANTIC_THRESHOLD cosine similarity of a cached one. Entries expire after
+# PLOT_CACHE_TTL seconds and the least recently used go first once
+# PLOT_CACHE_SIZE is reached.
+CACHE_SIZE = int(os.environ.get("PLOT_CACHE_SIZE", "512"))
+CACHE_TTL = int(os.environ.get("PLOT_CACHE_TTL", str(24 * 60 * 60)))
+SEMANTIC_THRESHOLD = float(os.environ.get("PLOT_SEMANTIC_THRESHOLD", "0.92"))
+EMBED_MODEL = os.environ.get("PLOT_EMBED_MODEL", "all-MiniLM-L6-v2")
+
+
+def normalize(topic):
+    return re.sub(r"\s+", " ", topic.lower()).strip(" .!?")
+
+
+def semantic_available():
+    return importlib.util.find_spec("sentence_transformers") is not None
+
+
+# Unit-length embedding function from a local sentence-transformers model
+def load_embedder(model_name=EMBED_MODEL):
+    from sentence_transformers import SentenceTransformer
+
+    model = SentenceTransformer(model_name, device="cpu")
+
+    @lru_cache(maxsize=1024)
+    def embed(text):
+        return model.encode(text, normalize_embeddings=True)
+
+    return embed
+
+
+class PlotCache:
+    def __init__(self, embed=None, size=CACHE_SIZE, ttl=CACHE_TTL, threshold=SEMANTIC_THRESHOLD):
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.embed = embed
+        self.size = size
+        self.ttl = ttl
+        self.threshold = threshold
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+    def get(self, topic):
+        key = normalize(topic)
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[1] > now:
+                self.entries.move_to_end(key)
+                self.exact_hits += 1
+                return entry[0]
+
+        if self.embed is not None:
+            vector = self.embed(key)
+            with self.lock:
+                keys = [k for k, entry in self.entries.items() if entry[1] > now]
+                if keys:
+                    scores = np.stack([self.entries[k][2] for k in keys]) @ vector
+                    best = int(np.argmax(scores))
+                    if scores[best] >= self.threshold:
+                        self.entries.move_to_end(keys[best])
+                        self.semantic_hits += 1
+                        return self.entries[keys[best]][0]
+
+        with self.lock:
+            self.misses += 1
+        return None
+
+    def put(self, topic, response):
+        key = normalize(topic)
+        vector = self.embed(key) if self.embed is not None else None
+        with self.lock:
+            self.entries[key] = (response, time.time() + self.ttl, vector)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    def stats(self):
+        with self.lock:
+            lookups = self.exact_hits + self.semantic_hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "semantic": self.embed is not None,
+                "lookups": lookups,
+                "exactHits": self.exact_hits,
+                "semanticHits": self.semantic_hits,
+                "misses": self.misses,
+                "hitRate": (self.exact_hits + self.semantic_hits) / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,136 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+# Per-user dashboard figures computed for all users at once with groupby and
+# kept as ready-to-send JSON, so /portfolio returns a few kilobytes instead
+# of the raw rows.
+#   holdings     - open position per ISIN: net size (BUY minus SELL), average
+#                  cost per unit including buy fees, and the cost basis of
+#                  the open size at that average. The rows start mid-history,
+#                  so sells can exceed buys; such short positions, and ones
+#                  without any buy, have no known basis (costBasis None) and
+#                  are left out of invested
+#   cashFlow     - bank money in and out per transaction type, and card
+#                  spend per merchant category (mcc)
+#   monthlySpend - card spend per calendar month
+#   cash         - net bank flow (credits minus debits)
+SPEND_TYPES = ["CARD", "CARD_ORDER"]
+CLOSED_SIZE = 1e-9
+
+
+def holdings(trade):
+    buy = trade["direction"] == "BUY"
+    notional = trade["executionSize"] * trade["executionPrice"]
+    frame = pd.DataFrame(
+        {
+            "userId": trade["userId"],
+            "ISIN": trade["ISIN"],
+            "size": np.where(buy, trade["executionSize"], -trade["executionSize"]),
+            "buySize": np.where(buy, trade["executionSize"], 0.0),
+            "buyCost": np.where(buy, notional + trade["executionFee"], 0.0),
+        }
+    )
+    grouped = frame.groupby(["userId", "ISIN"], observed=True, sort=False).sum()
+    grouped = grouped[grouped["size"].abs() > CLOSED_SIZE]
+    grouped["avgCost"] = grouped["buyCost"] / grouped["buySize"].where(grouped["buySize"] > 0)
+    grouped["costBasis"] = (grouped["size"] * grouped["avgCost"]).where(grouped["size"] > 0)
+    return grouped.reset_index()
+
+
+def cash_flow(bank):
+    signed = bank["amount"].where(bank["side"] == "CREDIT", -bank["amount"])
+    frame = pd.DataFrame(
+        {
+            "userId": bank["userId"],
+            "type": bank["type"],
+            "credit": bank["amount"].where(bank["side"] == "CREDIT", 0.0),
+            "debit": bank["amount"].where(bank["side"] == "DEBIT", 0.0),
+            "net": signed,
+        }
+    )
+    by_type = frame.groupby(["userId", "type"], observed=True, sort=False)[["credit", "debit"]].sum()
+    cash = frame.groupby("userId", observed=True, sort=False)["net"].sum()
+
+    spend = bank[bank["type"].isin(SPEND_TYPES) & (bank["side"] == "DEBIT")]
+    by_mcc = spend.groupby(["userId", "mcc"], observed=True, sort=False)["amount"].sum()
+    months = spend["bookingDate"].dt.to_period("M").astype(str)
+    monthly = spend["amount"].groupby([spend["userId"], months], observed=True).sum()
+    return by_type.reset_index(), cash, by_mcc.reset_index(), monthly.reset_index()
+
+
+def empty_summary():
+    return {
+        "holdings": [],
+        "invested": 0.0,
+        "fees": 0.0,
+        "cash": 0.0,
+        "cashFlow": {"byType": {}, "byMcc": {}},
+        "monthlySpend": [],
+    }
+
+
+def rounded(value, digits):
+    return None if np.isnan(value) else round(float(value), digits)
+
+
+# userId -> dashboard summary for every user present in either frame
+def summaries(trade, bank):
+    positions = holdings(trade)
+    fees = trade["executionFee"].astype("float64").groupby(trade["userId"], observed=True).sum()
+    by_type, cash, by_mcc, monthly = cash_flow(bank)
+
+    users = {}
+    for row in positions.itertuples(index=False):
+        user = users.setdefault(row.userId, empty_summary())
+        user["holdings"].append(
+            {
+                "isin": row.ISIN,
+                "size": round(float(row.size), 6),
+                "avgCost": rounded(row.avgCost, 4),
+                "costBasis": rounded(row.costBasis, 2),
+            }
+        )
+        if not np.isnan(row.costBasis):
+            user["invested"] += row.costBasis
+    for user_id, total in fees.items():
+        users.setdefault(user_id, empty_summary())["fees"] = round(float(total), 2)
+    for user_id, net in cash.items():
+        users.setdefault(user_id, empty_summary())["cash"] = round(float(net), 2)
+    for row in by_type.itertuples(index=False):
+        flows = users.setdefault(row.userId, empty_summary())["cashFlow"]["byType"]
+        flows[row.type] = {"in": round(float(row.credit), 2), "out": round(float(row.debit), 2)}
+    for row in by_mcc.itertuples(index=False):
+        flows = users.setdefault(row.userId, empty_summary())["cashFlow"]["byMcc"]
+        flows[str(int(row.mcc))] = round(float(row.amount), 2)
+    for row in monthly.itertuples(index=False):
+        spend = users.setdefault(row.userId, empty_summary())["monthlySpend"]
+        spend.append({"month": row.bookingDate, "spend": round(float(row.amount), 2)})
+
+    for user in users.values():
+        user["invested"] = round(float(user["invested"]), 2)
+        user["holdings"].sort(key=lambda holding: -(holding["costBasis"] or 0))
+        user["monthlySpend"].sort(key=lambda month: month["month"])
+    return users
+
+
+class PortfolioStore:
+    def __init__(self, trade, bank):
+        self.payloads = {
+            user_id: json.dumps(summary) for user_id, summary in summaries(trade, bank).items()
+        }
+
+    # Recompute the users present in trade and bank, which must hold all of
+    # their rows; everyone else keeps their payload
+    def refresh(self, trade, bank):
+        payloads = dict(self.payloads)
+        for user_id, summary in summaries(trade, bank).items():
+            payloads[user_id] = json.dumps(summary)
+        self.payloads = payloads
+
+    def payload(self, user_id):
+        return self.payloads.get(user_id, EMPTY_PORTFOLIO)
+
+
+EMPTY_PORTFOLIO = json.dumps(empty_summary())
@@ -0,0 +1,62 @@
+import argparse
+import subprocess
+import sys
+import time
+
+# Startup budget of the web app: wall time of "import <module>" in a fresh
+# interpreter, and the modules that dominate it according to -X importtime.
+# With --prewarm the time to build every lazy resource is shown as well.
+TOP = 15
+
+
+def import_profile(module):
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+    )
+    wall = time.perf_counter() - start
+    if result.returncode:
+        sys.exit(result.stderr[-2000:])
+
+    # Lines look like "import time: self [us] | cumulative | imported package"
+    # with two spaces of indentation per nesting level. Modules imported by
+    # the target (level 1) and by those (level 2) are kept; self time
+    # includes running the module body, e.g. loading data.
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        own, cumulative, name = line[len("import time:") :].split("|")
+        level = (len(name) - len(name.lstrip()) - 1) // 2
+        if level <= 2:
+            modules.append((int(cumulative), int(own), "  " * level + name.strip()))
+    return wall, sorted(modules, reverse=True)
+
+
+def prewarm_time(module):
+    code = (
+        "import time, lazy\n"
+        f"import {module}\n"
+        "start = time.perf_counter()\n"
+        "lazy.prewarm()\n"
+        "print(time.perf_counter() - start)\n"
+    )
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("module", nargs="?", default="back")
+    parser.add_argument("--prewarm", action="store_true")
+    args = parser.parse_args()
+
+    wall, modules = import_profile(args.module)
+    print(f"import {args.module}: {wall:.2f}s wall (interpreter start included)")
+    print(f"{'total ms':>9} {'self ms':>8}  module")
+    for cumulative, own, name in modules[:TOP]:
+        print(f"{cumulative / 1000:>9.1f} {own / 1000:>8.1f}  {name}")
+    if args.prewarm:
+        print(f"prewarm: {prewarm_time(args.module):.2f}s")
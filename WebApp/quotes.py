@@ -0,0 +1,66 @@
+import threading
+import time
+from concurrent.futures import Future
+
+import requests
+
+# Quotes are reused for this many seconds before going upstream again
+QUOTE_TTL = 15
+ALPHA_VANTAGE_URL = "https://www.alphavantage.co/query"
+
+session = requests.Session()
+
+
+# GLOBAL_QUOTE is the smallest Alpha Vantage payload carrying the latest price
+def fetch_global_quote(ticker_symbol, api_key):
+    response = session.get(
+        ALPHA_VANTAGE_URL,
+        params={"function": "GLOBAL_QUOTE", "symbol": ticker_symbol, "apikey": api_key},
+        timeout=10,
+    )
+    data = response.json()
+    if "Global Quote" not in data:
+        # Rate limit notes and error messages come back without the quote
+        raise ValueError(f"Unexpected quote response for {ticker_symbol}: {data}")
+    price = data["Global Quote"].get("05. price")
+    return float(price) if price else None
+
+
+# Short-TTL price cache with single-flight fetching: concurrent requests for
+# the same symbol wait on one upstream call instead of each making their own
+class QuoteService:
+    def __init__(self, fetch, ttl=QUOTE_TTL):
+        self.fetch = fetch
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.prices = {}
+        self.inflight = {}
+
+    def get(self, ticker_symbol):
+        ticker_symbol = ticker_symbol.upper()
+        with self.lock:
+            entry = self.prices.get(ticker_symbol)
+            if entry and entry[1] > time.monotonic():
+                return entry[0]
+            call = self.inflight.get(ticker_symbol)
+            leader = call is None
+            if leader:
+                call = self.inflight[ticker_symbol] = Future()
+
+        if not leader:
+            return call.result()
+
+        try:
+            price = self.fetch(ticker_symbol)
+        except Exception as e:
+            with self.lock:
+                del self.inflight[ticker_symbol]
+            call.set_exception(e)
+            raise
+
+        with self.lock:
+            if price is not None:
+                self.prices[ticker_symbol] = (price, time.monotonic() + self.ttl)
+            del self.inflight[ticker_symbol]
+        call.set_result(price)
+        return price
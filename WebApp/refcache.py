@@ -0,0 +1,116 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+# Reference data cache (ISIN -> company, company -> ticker) shared by the
+# offline enrichment script and the live assistant. Entries live in SQLite
+# with a per-entry expiry; a small in-memory LRU sits in front of it.
+# A stored None is a cached miss.
+DB_PATH = os.environ.get(
+    "REFCACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "refcache.sqlite3"),
+)
+MEMORY_SIZE = 4096
+MISSING = object()
+
+DAY = 24 * 60 * 60
+
+
+class RefCache:
+    def __init__(self, path=DB_PATH, memory_size=MEMORY_SIZE):
+        self.lock = threading.Lock()
+        self.memory = OrderedDict()
+        self.memory_size = memory_size
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT, expires REAL NOT NULL,"
+            " PRIMARY KEY (namespace, key))"
+        )
+
+    def _remember(self, item, value, expires):
+        self.memory[item] = (value, expires)
+        self.memory.move_to_end(item)
+        while len(self.memory) > self.memory_size:
+            self.memory.popitem(last=False)
+
+    def get(self, namespace, key):
+        return self.get_many(namespace, [key]).get(key, MISSING)
+
+    def get_many(self, namespace, keys):
+        now = time.time()
+        found = {}
+        with self.lock:
+            pending = []
+            for key in keys:
+                entry = self.memory.get((namespace, key))
+                if entry is not None and entry[1] > now:
+                    self.memory.move_to_end((namespace, key))
+                    found[key] = entry[0]
+                else:
+                    pending.append(key)
+
+            # SQLite caps the number of bound parameters per statement
+            for i in range(0, len(pending), 500):
+                chunk = pending[i : i + 500]
+                rows = self.conn.execute(
+                    f"SELECT key, value, expires FROM entries WHERE namespace = ?"
+                    f" AND key IN ({', '.join('?' * len(chunk))}) AND expires > ?",
+                    [namespace, *chunk, now],
+                )
+                for key, value, expires in rows:
+                    found[key] = json.loads(value)
+                    self._remember((namespace, key), found[key], expires)
+        return found
+
+    def put(self, namespace, key, value, ttl):
+        self.put_many(namespace, {key: value}, ttl)
+
+    def put_many(self, namespace, items, ttl):
+        expires = time.time() + ttl
+        with self.lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)",
+                [(namespace, key, json.dumps(value), expires) for key, value in items.items()],
+            )
+            for key, value in items.items():
+                self._remember((namespace, key), value, expires)
+
+
+cache = None
+cache_pid = None
+cache_lock = threading.Lock()
+
+
+# One cache per process; SQLite connections must not cross a fork
+def get_cache():
+    global cache, cache_pid
+    with cache_lock:
+        if cache is None or cache_pid != os.getpid():
+            cache = RefCache()
+            cache_pid = os.getpid()
+        return cache
+
+
+# Cache a single-argument lookup. Results, including None for "not found",
+# are cached; a lookup that raises is not, so transient errors are retried.
+def cached(namespace, ttl, miss_ttl, normalize=str):
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(arg):
+            key = normalize(arg)
+            value = get_cache().get(namespace, key)
+            if value is not MISSING:
+                return value
+            value = fn(arg)
+            get_cache().put(namespace, key, value, ttl if value is not None else miss_ttl)
+            return value
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,287 @@
+import copy
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+# Pre-aggregated rollups of the bank and trade rows. Per user, rows are
+# summed into day buckets keyed by a few dimensions (bank: type, mcc, side;
+# trade: ISIN, direction), and the day buckets are summed again into month
+# buckets. A date range query reads whole months from the month level and
+# only the partial months at its edges from the day level, so it touches a
+# handful of buckets instead of every row. New rows can be added at any
+# time; only the users they belong to are re-aggregated.
+#
+# Keys are int64 arrays (time, then one code per dimension) sorted by time,
+# measures are float64 arrays; dimension values are kept in a per-dimension
+# vocabulary. The buckets and the vocabulary are one state tuple that add
+# replaces whole, so a query decodes codes with the vocabulary they were
+# encoded with, and a copy's add never touches the original. save/load write
+# everything to one .npz file.
+MIN_DAY = np.iinfo(np.int64).min
+MAX_DAY = np.iinfo(np.int64).max
+
+
+def day_numbers(dates):
+    return dates.to_numpy().astype("datetime64[D]").astype(np.int64)
+
+
+def day_number(date):
+    return int(np.datetime64(pd.Timestamp(date), "D").astype(np.int64))
+
+
+def month_of(days):
+    return np.asarray(days).astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+
+
+def month_start(months):
+    return np.asarray(months).astype("datetime64[M]").astype("datetime64[D]").astype(np.int64)
+
+
+# Monday of the week (1970-01-01 was a Thursday)
+def week_start(days):
+    return days - (days + 3) % 7
+
+
+def aggregate(keys, measures):
+    if not len(keys):
+        return keys, measures
+    unique, inverse = np.unique(keys, axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    sums = np.column_stack(
+        [np.bincount(inverse, weights=measures[:, i], minlength=len(unique)) for i in range(measures.shape[1])]
+    )
+    return unique, sums
+
+
+class Rollup:
+    def __init__(self, dims, measures):
+        self.dims = dims
+        self.measures = measures
+        self.lock = threading.Lock()
+        # (users, codes, values): userId -> ((keys, sums) at day level,
+        # (keys, sums) at month level), and per dimension value -> code and
+        # the values in code order
+        self.state = ({}, {dim: {} for dim in dims}, {dim: [] for dim in dims})
+
+    @staticmethod
+    def encode(codes, values, column):
+        for value in pd.unique(column):
+            if value not in codes:
+                codes[value] = len(values)
+                values.append(value)
+        return np.fromiter((codes[value] for value in column), dtype=np.int64, count=len(column))
+
+    # rows: userId, day (datetime64), one column per dimension and measure.
+    # Returns the users whose buckets changed.
+    def add(self, rows):
+        if rows.empty:
+            return set()
+        with self.lock:
+            tables, codes, values = self.state
+            # New dicts and lists are swapped in at the end so a query never
+            # mixes buckets or codes from before and after the batch
+            tables = dict(tables)
+            codes = {dim: dict(codes[dim]) for dim in self.dims}
+            values = {dim: list(values[dim]) for dim in self.dims}
+            keys = np.column_stack(
+                [day_numbers(rows["day"])]
+                + [self.encode(codes[dim], values[dim], rows[dim].to_numpy()) for dim in self.dims]
+            )
+            measures = rows[self.measures].to_numpy(dtype=np.float64)
+            users = rows["userId"].to_numpy()
+            for user_id, positions in pd.Series(users).groupby(users, sort=False).indices.items():
+                user_keys, user_sums = keys[positions], measures[positions]
+                if user_id in tables:
+                    old_keys, old_sums = tables[user_id][0]
+                    user_keys = np.concatenate([old_keys, user_keys])
+                    user_sums = np.concatenate([old_sums, user_sums])
+                day_keys, day_sums = aggregate(user_keys, user_sums)
+                month_keys = day_keys.copy()
+                month_keys[:, 0] = month_of(day_keys[:, 0])
+                tables[user_id] = ((day_keys, day_sums), aggregate(month_keys, day_sums))
+            self.state = (tables, codes, values)
+            return set(pd.unique(users))
+
+    def _mask(self, keys, lo, hi, filters, codes):
+        mask = (keys[:, 0] >= lo) & (keys[:, 0] <= hi)
+        for dim, wanted in filters.items():
+            wanted = [codes[dim][value] for value in wanted if value in codes[dim]]
+            mask &= np.isin(keys[:, 1 + self.dims.index(dim)], wanted)
+        return mask
+
+    # Sum the measures of one user between since and until (inclusive
+    # datetime-likes or None), optionally filtered by dimension values and
+    # grouped by a dimension and/or a day/week/month bucket. Returns a dict of
+    # arrays with one entry per group: "bucket" (start of each bucket, when
+    # bucketed), the grouping dimension's values and one sum per measure.
+    def query(self, user_id, since=None, until=None, filters=None, by=None, bucket=None):
+        filters = filters or {}
+        tables, codes, values = self.state
+        days, months = tables.get(user_id, (None, None))
+        width = len(values[by]) if by else 1
+        lo = MIN_DAY if since is None else day_number(since)
+        hi = MAX_DAY if until is None else day_number(until)
+        if days is not None and len(days[0]):
+            lo = max(lo, int(days[0][0, 0]))
+            hi = min(hi, int(days[0][-1, 0]))
+        if days is None or lo > hi:
+            return self.result(np.empty(0, np.int64), np.empty((0, len(self.measures))), by, values, bucket)
+
+        day_keys, day_sums = days
+        parts = []
+        first_month = int(month_of(lo)) + (int(month_start(month_of(lo))) < lo)
+        last_month = int(month_of(hi)) - (int(month_start(month_of(hi) + 1)) - 1 > hi)
+        if bucket in (None, "month") and first_month <= last_month:
+            month_keys, month_sums = months
+            mask = self._mask(month_keys, first_month, last_month, filters, codes)
+            keys = month_keys[mask].copy()
+            keys[:, 0] = month_start(keys[:, 0])
+            parts.append((keys, month_sums[mask]))
+            edges = [(lo, int(month_start(first_month)) - 1), (int(month_start(last_month + 1)), hi)]
+        else:
+            edges = [(lo, hi)]
+        for edge_lo, edge_hi in edges:
+            if edge_lo <= edge_hi:
+                mask = self._mask(day_keys, edge_lo, edge_hi, filters, codes)
+                parts.append((day_keys[mask], day_sums[mask]))
+        keys = np.concatenate([part[0] for part in parts])
+        sums = np.concatenate([part[1] for part in parts])
+
+        # One int64 per group: bucket start day and/or dimension code
+        group = np.zeros(len(keys), np.int64)
+        if bucket == "month":
+            group = month_start(month_of(keys[:, 0]))
+        elif bucket == "week":
+            group = week_start(keys[:, 0])
+        elif bucket == "day":
+            group = keys[:, 0]
+        if by:
+            group = group * width + keys[:, 1 + self.dims.index(by)]
+        groups, inverse = np.unique(group, return_inverse=True)
+        sums = np.column_stack(
+            [np.bincount(inverse, weights=sums[:, i], minlength=len(groups)) for i in range(len(self.measures))]
+        )
+        return self.result(groups, sums, by, values, bucket)
+
+    # values: the vocabulary the groups were encoded with
+    def result(self, groups, sums, by, values, bucket):
+        result = {}
+        if by:
+            groups, codes = np.divmod(groups, len(values[by]))
+            result[by] = [values[by][code] for code in codes]
+        if bucket:
+            result["bucket"] = groups.astype("datetime64[D]").astype("datetime64[ns]")
+        for i, measure in enumerate(self.measures):
+            result[measure] = sums[:, i]
+        return result
+
+    def save(self, path):
+        tables, _, values = self.state
+        users = list(tables)
+        arrays = {"users": np.array(users, dtype=str)}
+        for index, level in enumerate(("day", "month")):
+            keys = [tables[user][index][0] for user in users] or [np.empty((0, 1 + len(self.dims)), np.int64)]
+            sums = [tables[user][index][1] for user in users] or [np.empty((0, len(self.measures)))]
+            arrays[f"{level}_keys"] = np.concatenate(keys)
+            arrays[f"{level}_sums"] = np.concatenate(sums)
+            arrays[f"{level}_sizes"] = np.array([len(tables[user][index][0]) for user in users], dtype=np.int64)
+        for dim in self.dims:
+            arrays[f"vocab_{dim}"] = np.array(values[dim])
+        temp = f"{path}.{os.getpid()}.tmp.npz"
+        np.savez(temp, **arrays)
+        os.replace(temp, path)
+
+    @classmethod
+    def load(cls, path, dims, measures):
+        rollup = cls(dims, measures)
+        with np.load(path) as data:
+            values = {dim: data[f"vocab_{dim}"].tolist() for dim in dims}
+            codes = {dim: {value: code for code, value in enumerate(values[dim])} for dim in dims}
+            levels = []
+            for level in ("day", "month"):
+                bounds = np.cumsum(data[f"{level}_sizes"])[:-1]
+                levels.append(
+                    zip(np.split(data[f"{level}_keys"], bounds), np.split(data[f"{level}_sums"], bounds))
+                )
+            rollup.state = (dict(zip(data["users"].tolist(), zip(*levels))), codes, values)
+        return rollup
+
+
+BANK_DIMS = ["type", "mcc", "side"]
+BANK_MEASURES = ["count", "amount"]
+TRADE_DIMS = ["ISIN", "direction"]
+TRADE_MEASURES = ["count", "executionSize", "notional", "executionFee", "netSize", "netNotional"]
+
+
+def bank_rows(bank):
+    return pd.DataFrame(
+        {
+            "userId": bank["userId"].astype(str),
+            "day": bank["bookingDate"],
+            "type": bank["type"].astype(str),
+            # Rows without a merchant category get code -1
+            "mcc": bank["mcc"].fillna(-1).astype(np.int64),
+            "side": bank["side"].astype(str),
+            "count": 1.0,
+            "amount": bank["amount"].astype(np.float64),
+        }
+    )
+
+
+def trade_rows(trade):
+    # SELL counts negative in the net measures
+    sign = np.where(trade["direction"] == "SELL", -1.0, 1.0)
+    notional = trade["executionSize"] * trade["executionPrice"]
+    return pd.DataFrame(
+        {
+            "userId": trade["userId"].astype(str),
+            "day": trade["executedAt"],
+            "ISIN": trade["ISIN"].astype(str),
+            "direction": trade["direction"].astype(str),
+            "count": 1.0,
+            "executionSize": trade["executionSize"].astype(np.float64),
+            "notional": notional,
+            "executionFee": trade["executionFee"].astype(np.float64),
+            "netSize": sign * trade["executionSize"].astype(np.float64),
+            "netNotional": sign * notional,
+        }
+    )
+
+
+class Rollups:
+    def __init__(self, bank, trade):
+        self.bank = bank
+        self.trade = trade
+
+    # Copies whose add leaves this instance's buckets and vocabulary untouched
+    def __copy__(self):
+        return Rollups(copy.copy(self.bank), copy.copy(self.trade))
+
+    @classmethod
+    def build(cls, bank_frame, trade_frame):
+        rollups = cls(Rollup(BANK_DIMS, BANK_MEASURES), Rollup(TRADE_DIMS, TRADE_MEASURES))
+        rollups.add(bank_frame, trade_frame)
+        return rollups
+
+    def add(self, bank_frame=None, trade_frame=None):
+        changed = set()
+        if bank_frame is not None:
+            changed |= self.bank.add(bank_rows(bank_frame))
+        if trade_frame is not None:
+            changed |= self.trade.add(trade_rows(trade_frame))
+        return changed
+
+    def save(self, path):
+        base = os.path.splitext(path)[0]
+        self.bank.save(f"{base}.bank.npz")
+        self.trade.save(f"{base}.trade.npz")
+
+    @classmethod
+    def load(cls, path):
+        base = os.path.splitext(path)[0]
+        return cls(
+            Rollup.load(f"{base}.bank.npz", BANK_DIMS, BANK_MEASURES),
+            Rollup.load(f"{base}.trade.npz", TRADE_DIMS, TRADE_MEASURES),
+        )
@@ -0,0 +1,72 @@
+from concurrent.futures import ThreadPoolExecutor
+from string import Formatter
+
+from tts_stream import split_sentences
+
+# Speech for templated replies built from pieces: the constant fragments of
+# a template ("There are", "transactions for") are synthesized once and
+# cached, only the slots (numbers, company names) can miss, and the MP3
+# segments are joined frame by frame without re-encoding.
+SEGMENT_WORKERS = 4
+
+pool = ThreadPoolExecutor(max_workers=SEGMENT_WORKERS)
+
+
+# A reply string that remembers the template and slots it was made from, so
+# it prints and compares like the plain text but can be spoken in segments
+class TemplateReply(str):
+    def __new__(cls, template, **slots):
+        reply = super().__new__(cls, template.format(**slots))
+        reply.template = template
+        reply.slots = slots
+        return reply
+
+    def segments(self):
+        segments = []
+        for literal, field, spec, conversion in Formatter().parse(self.template):
+            segments.append(literal)
+            if field is not None:
+                value = self.slots[field]
+                if conversion:
+                    value = {"s": str, "r": repr, "a": ascii}[conversion](value)
+                segments.append(format(value, spec or ""))
+        return [text for text in map(speakable, segments) if text]
+
+
+# Fragment text as sent to TTS; pieces with nothing to pronounce are dropped
+def speakable(text):
+    text = text.strip()
+    return text if any(c.isalnum() for c in text) else ""
+
+
+def template_fragments(template):
+    literals = (literal for literal, _, _, _ in Formatter().parse(template))
+    return [text for text in map(speakable, literals) if text]
+
+
+# Sentences to synthesize for a reply; a templated reply stays whole so the
+# synthesizer can splice it
+def speech_sentences(reply):
+    if isinstance(reply, TemplateReply):
+        return [reply]
+    return split_sentences(reply)
+
+
+# ID3v2 header at the start and ID3v1 tag at the end; only MPEG frames may
+# appear in the middle of the joined stream
+def strip_id3(audio):
+    if audio[:3] == b"ID3" and len(audio) >= 10:
+        size = audio[6] << 21 | audio[7] << 14 | audio[8] << 7 | audio[9]
+        footer = 10 if audio[5] & 0x10 else 0
+        audio = audio[10 + size + footer :]
+    if len(audio) >= 128 and audio[-128:-125] == b"TAG":
+        audio = audio[:-128]
+    return audio
+
+
+def join_segments(parts):
+    return b"".join(strip_id3(part) for part in parts)
+
+
+def splice(reply, synthesize):
+    return join_segments(pool.map(synthesize, reply.segments()))
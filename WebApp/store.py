@@ -0,0 +1,61 @@
+import json
+
+EMPTY_PAYLOAD = json.dumps({"trade": "[]", "bank": "[]"})
+
+
+# Per-user partitions of the trade and bank frames, grouped once at startup.
+# Appended rows only touch the partitions and payloads of their users.
+class UserStore:
+    def __init__(self, trade, bank):
+        self.trade = self._partition(trade)
+        self.bank = self._partition(bank)
+        self.payloads = {}
+        for user_id in self.trade.keys() | self.bank.keys():
+            self.payloads[user_id] = self._serialize(user_id)
+
+    @staticmethod
+    def _partition(frame):
+        return {
+            user_id: group.reset_index(drop=True)
+            for user_id, group in frame.groupby("userId", sort=False, observed=True)
+        }
+
+    # Each dict is copied, updated and swapped in whole, so a reader sees a
+    # batch either entirely or not at all. Returns the users that changed.
+    def append(self, trade=None, bank=None):
+        users = set()
+        if trade is not None:
+            self.trade = self._extend(self.trade, trade, users)
+        if bank is not None:
+            self.bank = self._extend(self.bank, bank, users)
+        payloads = dict(self.payloads)
+        for user_id in users:
+            payloads[user_id] = self._serialize(user_id)
+        self.payloads = payloads
+        return users
+
+    @staticmethod
+    def _extend(partitions, frame, users):
+        from ingest import concat
+
+        partitions = dict(partitions)
+        for user_id, group in frame.groupby("userId", sort=False, observed=True):
+            old = partitions.get(user_id)
+            partitions[user_id] = group.reset_index(drop=True) if old is None else concat([old, group])
+            users.add(user_id)
+        return partitions
+
+    def _serialize(self, user_id):
+        # Same shape /data always returned: each side is a records JSON string.
+        # Timestamps are written as ISO 8601 strings.
+        trade = self.trade.get(user_id)
+        bank = self.bank.get(user_id)
+        return json.dumps(
+            {
+                "trade": "[]" if trade is None else trade.to_json(orient="records", date_format="iso"),
+                "bank": "[]" if bank is None else bank.to_json(orient="records", date_format="iso"),
+            }
+        )
+
+    def payload(self, user_id):
+        return self.payloads.get(user_id, EMPTY_PAYLOAD)
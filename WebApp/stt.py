@@ -0,0 +1,61 @@
+import io
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Speech-to-text backends. STT_BACKEND=openai (default) sends audio to the
+# Whisper API; STT_BACKEND=local runs a quantized Whisper model on the CPU
+# through faster-whisper (optional dependency), loaded once and kept warm.
+# Local requests from concurrent sessions decode in parallel, each on its own
+# as soon as a worker is free.
+STT_BACKEND = os.environ.get("STT_BACKEND", "openai")
+LOCAL_MODEL = os.environ.get("STT_LOCAL_MODEL", "base.en")
+LOCAL_WORKERS = int(os.environ.get("STT_LOCAL_WORKERS", "2"))
+
+
+class WhisperAPI:
+    def __init__(self, client):
+        self.client = client
+
+    def transcribe(self, audio, filename="recording.webm"):
+        return self.client.audio.transcriptions.create(
+            model="whisper-1", file=(filename, audio)
+        ).text
+
+
+class LocalWhisper:
+    def __init__(self, model_name=LOCAL_MODEL, workers=LOCAL_WORKERS):
+        from faster_whisper import WhisperModel
+
+        # int8 weights on CPU; num_workers lets that many clips decode in
+        # parallel on the same loaded model
+        self.model = WhisperModel(
+            model_name, device="cpu", compute_type="int8", num_workers=workers
+        )
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+
+    def transcribe_one(self, audio):
+        segments, _ = self.model.transcribe(io.BytesIO(audio), beam_size=1, vad_filter=True)
+        return "".join(segment.text for segment in segments).strip()
+
+    def transcribe(self, audio, filename="recording.webm"):
+        return self.pool.submit(self.transcribe_one, audio).result()
+
+
+transcriber = None
+transcriber_lock = threading.Lock()
+
+
+def create_transcriber(client, backend=STT_BACKEND):
+    if backend == "local":
+        return LocalWhisper()
+    return WhisperAPI(client)
+
+
+# Shared transcriber for the configured backend, created on first use
+def get_transcriber(client):
+    global transcriber
+    with transcriber_lock:
+        if transcriber is None:
+            transcriber = create_transcriber(client)
+        return transcriber
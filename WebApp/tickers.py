@@ -0,0 +1,51 @@
+import os
+
+import requests
+
+from refcache import DAY, cached
+
+# Company name -> US ticker symbol through Alpha Vantage's SYMBOL_SEARCH,
+# shared by the web assistant and the standalone scripts. Found tickers and
+# "no US listing" answers go to the reference cache.
+ALPHA_VANTAGE_API_KEY = os.environ.get("ALPHA_VANTAGE_API_KEY", "")
+TICKER_TTL = 7 * DAY
+TICKER_MISS_TTL = DAY
+
+
+# Errors raise rather than being cached, so the next question retries them
+@cached("ticker", TICKER_TTL, TICKER_MISS_TTL, normalize=lambda name: name.strip().lower())
+def search_ticker(company_name):
+    url = f"https://www.alphavantage.co/query?function=SYMBOL_SEARCH&keywords={company_name}&apikey={ALPHA_VANTAGE_API_KEY}"
+    response = requests.get(url)
+    data = response.json()
+
+    # Log the full response for debugging
+    print(f"Full response for {company_name}: {data}")
+
+    if "bestMatches" not in data:
+        raise ValueError(f"Could not retrieve ticker for {company_name}")
+
+    # Iterate through the best matches to find the correct symbol
+    for match in data["bestMatches"]:
+        ticker = match.get("1. symbol")
+        company = match.get("2. name")
+        exchange = match.get("4. region", "").lower()
+
+        # Check if the region is the US and select the first US match
+        if "united states" in exchange:
+            print(
+                f"Ticker symbol found: {ticker} for company: {company} on exchange: {exchange}"
+            )
+            return ticker
+
+    # If no valid ticker is found in the US region, log and return None
+    print(f"Error: No valid ticker symbol found for {company_name} in the US region.")
+    return None
+
+
+def get_ticker_from_alphavantage(company_name):
+    try:
+        return search_ticker(company_name)
+    except Exception as e:
+        print(f"Error fetching ticker symbol from Alpha Vantage: {e}")
+        return None
@@ -0,0 +1,137 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+# Content-addressed cache of synthesized speech. Audio is keyed by a hash of
+# (model, voice, text), kept in an in-memory LRU and in a directory of MP3
+# files, each bounded in bytes. Warmed-up static phrases are pinned in
+# memory so chat replies cannot push them out. Besides those, only short
+# texts are stored (template fragments and slots, short sentences that
+# recur): a one-off chat sentence would only evict phrases that come back.
+CACHE_DIR = os.environ.get(
+    "TTS_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "tts_cache"),
+)
+MEMORY_BYTES = 16 * 1024 * 1024
+DISK_BYTES = 256 * 1024 * 1024
+CACHED_CHARS = 48
+
+
+def phrase_key(text, voice, model):
+    return hashlib.sha256(f"{model}\0{voice}\0{text}".encode()).hexdigest()
+
+
+def cacheable(text):
+    return len(text) <= CACHED_CHARS
+
+
+class SpeechCache:
+    def __init__(self, directory=CACHE_DIR, memory_bytes=MEMORY_BYTES, disk_bytes=DISK_BYTES):
+        self.lock = threading.Lock()
+        self.directory = directory
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self.pinned = {}
+        self.memory = OrderedDict()
+        self.memory_used = 0
+
+        # Files on disk, least recently used first (by modification time,
+        # which get() refreshes)
+        os.makedirs(directory, exist_ok=True)
+        entries = sorted(
+            (entry.stat().st_mtime, entry.name[:-4], entry.stat().st_size)
+            for entry in os.scandir(directory)
+            if entry.name.endswith(".mp3")
+        )
+        self.files = OrderedDict((key, size) for _, key, size in entries)
+        self.disk_used = sum(self.files.values())
+        self._evict_files()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".mp3")
+
+    def _remember(self, key, audio):
+        if key in self.memory:
+            self.memory_used -= len(self.memory.pop(key))
+        self.memory[key] = audio
+        self.memory_used += len(audio)
+        while self.memory_used > self.memory_bytes:
+            self.memory_used -= len(self.memory.popitem(last=False)[1])
+
+    def _evict_files(self):
+        while self.disk_used > self.disk_bytes and self.files:
+            key, size = self.files.popitem(last=False)
+            self.disk_used -= size
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def get(self, key):
+        with self.lock:
+            audio = self.pinned.get(key)
+            if audio is None:
+                audio = self.memory.get(key)
+                if audio is not None:
+                    self.memory.move_to_end(key)
+            if audio is not None:
+                return audio
+            if key not in self.files:
+                return None
+            try:
+                with open(self._path(key), "rb") as f:
+                    audio = f.read()
+                os.utime(self._path(key))
+            except OSError:
+                self.disk_used -= self.files.pop(key)
+                return None
+            self.files.move_to_end(key)
+            self._remember(key, audio)
+            return audio
+
+    def put(self, key, audio, pin=False):
+        with self.lock:
+            if pin:
+                self.pinned[key] = audio
+            else:
+                self._remember(key, audio)
+            if key in self.files:
+                return
+            # Write then rename so readers never see a partial file
+            temp = self._path(key) + f".{os.getpid()}.tmp"
+            try:
+                with open(temp, "wb") as f:
+                    f.write(audio)
+                os.replace(temp, self._path(key))
+            except OSError as e:
+                print(f"Could not store speech in cache: {e}")
+                return
+            self.files[key] = len(audio)
+            self.disk_used += len(audio)
+            self._evict_files()
+
+
+# Synthesize through the cache; only a miss calls the TTS endpoint
+def cached_speech(cache, text, voice, model, synthesize):
+    key = phrase_key(text, voice, model)
+    audio = cache.get(key)
+    if audio is None:
+        audio = synthesize(text)
+        if audio and cacheable(text):
+            cache.put(key, audio)
+    return audio
+
+
+# Synthesize the static phrases once and pin them in memory
+def warm_up(cache, phrases, voice, model, synthesize):
+    for text in phrases:
+        key = phrase_key(text, voice, model)
+        audio = cache.get(key)
+        try:
+            if audio is None:
+                audio = synthesize(text)
+        except Exception as e:
+            print(f"Could not warm up phrase {text!r}: {e}")
+            continue
+        cache.put(key, audio, pin=True)
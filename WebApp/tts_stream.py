@@ -0,0 +1,135 @@
+import asyncio
+import queue
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Sentence-by-sentence speech synthesis: the answer is cut into sentences,
+# up to LOOKAHEAD of them are synthesized concurrently, and their MP3 data
+# is yielded in order, so playback can start after the first sentence.
+# MP3 frames are self-delimiting, so the chunks concatenate into one stream.
+# Sentences may come from a finished string or from a streamed completion
+# that is still being generated.
+LOOKAHEAD = 3
+MIN_SENTENCE_CHARS = 20
+
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+|\n+")
+
+
+# Cuts text arriving in pieces (LLM tokens) into sentences as soon as each
+# one is complete
+class SentenceSplitter:
+    def __init__(self):
+        self.buffer = ""
+        self.short = ""
+
+    def feed(self, text):
+        self.buffer += text
+        parts = SENTENCE_END.split(self.buffer)
+        self.buffer = parts.pop()
+        return [sentence for sentence in map(self._sentence, parts) if sentence]
+
+    def flush(self):
+        sentence = self._sentence(self.buffer) or ""
+        self.buffer = ""
+        tail = f"{self.short} {sentence}".strip()
+        self.short = ""
+        return [tail] if tail else []
+
+    def _sentence(self, part):
+        part = part.strip()
+        if not part:
+            return None
+        # Very short fragments ("Hi!") are merged with the next sentence
+        part = f"{self.short} {part}".strip()
+        if len(part) < MIN_SENTENCE_CHARS:
+            self.short = part
+            return None
+        self.short = ""
+        return part
+
+
+def split_sentences(text):
+    splitter = SentenceSplitter()
+    return splitter.feed(text) + splitter.flush()
+
+
+def iter_sentences(chunks):
+    splitter = SentenceSplitter()
+    for chunk in chunks:
+        yield from splitter.feed(chunk)
+    yield from splitter.flush()
+
+
+async def aiter_sentences(chunks):
+    splitter = SentenceSplitter()
+    async for chunk in chunks:
+        for sentence in splitter.feed(chunk):
+            yield sentence
+    for sentence in splitter.flush():
+        yield sentence
+
+
+def stream_speech(sentences, synthesize, lookahead=LOOKAHEAD):
+    # Sentences are read on their own thread so finished audio is yielded
+    # while the next sentence is still being generated
+    pending = queue.Queue()
+    pool = ThreadPoolExecutor(max_workers=lookahead)
+
+    def produce():
+        try:
+            for sentence in sentences:
+                pending.put((sentence, pool.submit(synthesize, sentence)))
+        except Exception as e:
+            print(f"Error reading reply: {e}")
+        finally:
+            pending.put(None)
+
+    threading.Thread(target=produce, daemon=True).start()
+    try:
+        while (item := pending.get()) is not None:
+            sentence, future = item
+            try:
+                yield future.result()
+            except Exception as e:
+                # Headers are already sent; skip the sentence rather than abort
+                print(f"Error synthesizing {sentence!r}: {e}")
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+async def astream_speech(sentences, synthesize, lookahead=LOOKAHEAD):
+    limit = asyncio.Semaphore(lookahead)
+    pending = asyncio.Queue()
+
+    async def bounded(sentence):
+        async with limit:
+            return await synthesize(sentence)
+
+    async def produce():
+        try:
+            if hasattr(sentences, "__aiter__"):
+                async for sentence in sentences:
+                    pending.put_nowait((sentence, asyncio.create_task(bounded(sentence))))
+            else:
+                for sentence in sentences:
+                    pending.put_nowait((sentence, asyncio.create_task(bounded(sentence))))
+        except Exception as e:
+            print(f"Error reading reply: {e}")
+        finally:
+            pending.put_nowait(None)
+
+    producer = asyncio.create_task(produce())
+    tasks = []
+    try:
+        while (item := await pending.get()) is not None:
+            sentence, task = item
+            tasks.append(task)
+            try:
+                yield await task
+            except Exception as e:
+                print(f"Error synthesizing {sentence!r}: {e}")
+    finally:
+        producer.cancel()
+        for task in tasks:
+            task.cancel()
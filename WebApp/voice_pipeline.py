@@ -0,0 +1,162 @@
+import asyncio
+import uuid
+
+import httpx
+
+import assistant
+import stt
+from lazy import Lazy
+from spliced import TemplateReply, join_segments, speech_sentences
+from tts_cache import cacheable, phrase_key
+from tts_stream import aiter_sentences, astream_speech
+
+# Async version of interact_once for the ASGI server: every network stage
+# (speech-to-text, chat completion, text-to-speech) is awaited, and the
+# blocking intent/data lookups run in a worker thread, so one process can
+# keep many voice requests in flight. Without a key in assistant.py the
+# client falls back to OPENAI_API_KEY.
+def create_async_client():
+    from openai import AsyncOpenAI
+
+    return AsyncOpenAI(api_key=assistant.OPENAI_API_KEY or None)
+
+
+async_client = Lazy(create_async_client, "openai_async", client=True)
+upload_client = Lazy(lambda: httpx.AsyncClient(timeout=60), "upload", client=True)
+
+
+async def transcribe(audio, filename):
+    if stt.STT_BACKEND == "local":
+        transcriber = stt.get_transcriber(assistant.openai_client.get())
+        return await asyncio.to_thread(transcriber.transcribe, audio, filename)
+    transcript = await async_client.get().audio.transcriptions.create(
+        model="whisper-1", file=(filename, audio)
+    )
+    return transcript.text
+
+
+# Transcribe audio that is still being recorded: the multipart upload to
+# Whisper starts right away and each frame is forwarded as it arrives, so
+# the transfer overlaps with the user speaking. Nothing touches the disk.
+async def transcribe_stream(frames, filename="recording.webm"):
+    if stt.STT_BACKEND == "local":
+        # The local model needs the whole clip; there is no upload to overlap
+        audio = b"".join([frame async for frame in frames])
+        return await transcribe(audio, filename)
+
+    client = async_client.get()
+    boundary = uuid.uuid4().hex
+
+    async def body():
+        yield (
+            f"--{boundary}\r\n"
+            'Content-Disposition: form-data; name="model"\r\n\r\n'
+            "whisper-1\r\n"
+            f"--{boundary}\r\n"
+            f'Content-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+            "Content-Type: audio/webm\r\n\r\n"
+        ).encode()
+        async for frame in frames:
+            yield frame
+        yield f"\r\n--{boundary}--\r\n".encode()
+
+    response = await upload_client.get().post(
+        str(client.base_url.join("audio/transcriptions")),
+        content=body(),
+        headers={
+            "Authorization": f"Bearer {client.api_key}",
+            "Content-Type": f"multipart/form-data; boundary={boundary}",
+        },
+    )
+    response.raise_for_status()
+    return response.json()["text"]
+
+
+async def chat_reply(text, context, mode):
+    chat = await async_client.get().chat.completions.create(
+        model="gpt-3.5-turbo",
+        messages=[
+            {"role": "system", "content": assistant.system_prompt(context, mode)},
+            {"role": "user", "content": text},
+        ],
+        temperature=0.7,
+        max_tokens=150,
+    )
+    return chat.choices[0].message.content.strip()
+
+
+async def chat_reply_stream(text, context, mode):
+    stream = await async_client.get().chat.completions.create(
+        model="gpt-3.5-turbo",
+        messages=[
+            {"role": "system", "content": assistant.system_prompt(context, mode)},
+            {"role": "user", "content": text},
+        ],
+        temperature=0.7,
+        max_tokens=150,
+        stream=True,
+    )
+    async for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
+
+# Same phrase cache as the blocking path; only a miss calls the endpoint.
+# The cache takes a lock and reads and writes files, so it is used from a
+# worker thread rather than on the event loop.
+async def synthesize(text):
+    if isinstance(text, TemplateReply):
+        parts = await asyncio.gather(*map(synthesize, text.segments()))
+        return join_segments(parts)
+    key = phrase_key(text, assistant.TTS_VOICE, assistant.TTS_MODEL)
+    audio = await asyncio.to_thread(assistant.speech_cache.get, key)
+    if audio is None:
+        speech = await async_client.get().audio.speech.create(
+            model=assistant.TTS_MODEL, voice=assistant.TTS_VOICE, input=text
+        )
+        audio = speech.content
+        if audio and cacheable(text):
+            await asyncio.to_thread(assistant.speech_cache.put, key, audio)
+    return audio
+
+
+async def reply_to(command, context, mode):
+    if not command:
+        return assistant.NOT_UNDERSTOOD
+    reply = await asyncio.to_thread(assistant.answer_command, command)
+    if reply is None:
+        reply = await chat_reply(command, context, mode)
+    return reply
+
+
+async def handle_voice(audio, filename, context="", mode="normal"):
+    command = await transcribe(audio, filename)
+    reply = await reply_to(command, context, mode)
+    print(reply)
+    return await synthesize(reply)
+
+
+async def logged(sentences):
+    async for sentence in sentences:
+        print(sentence)
+        yield sentence
+
+
+# Speech for a transcribed command, sentence by sentence: chat model replies
+# go to speech synthesis while the model is still generating the next one
+async def speak_stream(command, context="", mode="normal"):
+    if not command:
+        sentences = [assistant.NOT_UNDERSTOOD]
+    else:
+        reply = await asyncio.to_thread(assistant.answer_command, command)
+        if reply is None:
+            sentences = logged(aiter_sentences(chat_reply_stream(command, context, mode)))
+        else:
+            print(reply)
+            sentences = speech_sentences(reply)
+    return astream_speech(sentences, synthesize)
+
+
+async def handle_voice_stream(audio, filename, context="", mode="normal"):
+    command = await transcribe(audio, filename)
+    return await speak_stream(command, context, mode)
@@ -0,0 +1,149 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Resolves a synthetic ISIN universe through extract.py against a local mock
+# of the OpenFIGI mapping endpoint. The mock enforces the 100-jobs-per-request
+# limit, adds a fixed latency per request and rate limits with 429 plus a
+# ratelimit-reset header, like the real service. The run goes through a fresh
+# reference cache, then repeats to show the warm-cache cost. Finally a
+# synthesized trade file of --rows rows goes through the chunked enrichment
+# (CSV and Parquet output) and through a single chunk holding the whole file,
+# with the peak memory of each run.
+UNIVERSE = 10_000
+LATENCY = 0.2
+RATE_LIMIT = 25  # requests per window
+RATE_WINDOW = 1.0
+PORT = 8099
+
+
+class MockFigi(BaseHTTPRequestHandler):
+    lock = threading.Lock()
+    window_start = time.monotonic()
+    window_requests = 0
+    requests_served = 0
+    rate_limited = 0
+
+    def do_POST(self):
+        jobs = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        if len(jobs) > 100:
+            self.reply(413, {"error": "Too many mapping jobs"})
+            return
+
+        cls = type(self)
+        with cls.lock:
+            now = time.monotonic()
+            if now - cls.window_start >= RATE_WINDOW:
+                cls.window_start, cls.window_requests = now, 0
+            cls.window_requests += 1
+            limited = cls.window_requests > RATE_LIMIT
+            reset = RATE_WINDOW - (now - cls.window_start)
+            if limited:
+                cls.rate_limited += 1
+            else:
+                cls.requests_served += 1
+        if limited:
+            self.reply(429, {"error": "Too many requests"}, {"ratelimit-reset": f"{reset:.3f}"})
+            return
+
+        time.sleep(LATENCY)
+        self.reply(200, [{"data": [{"name": f"COMPANY {job['idValue']}"}]} for job in jobs])
+
+    def reply(self, status, body, extra_headers=None):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (extra_headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+# Trades over the same ISIN universe, repeated up to rows
+def write_trades(path, rows):
+    import numpy as np
+    import pandas as pd
+
+    block = 100_000
+    rng = np.random.default_rng(0)
+    for start in range(0, rows, block):
+        size = min(block, rows - start)
+        pd.DataFrame(
+            {
+                "userId": rng.integers(0, 10_000, size).astype(str),
+                "executedAt": "2024-06-03 19:25:06.000",
+                "ISIN": [f"XX{i:010d}" for i in rng.integers(0, UNIVERSE, size)],
+                "direction": rng.choice(["BUY", "SELL"], size),
+                "executionSize": rng.random(size) * 100,
+                "executionPrice": rng.random(size) * 500,
+                "currency": "EUR",
+                "executionFee": 1.0,
+                "type": "REGULAR",
+            }
+        ).to_csv(path, mode="a", header=start == 0, index=False)
+
+
+# extract.py in a child process, which reports its own peak RSS
+def enrich_run(path, chunksize, parquet):
+    output = path + (".parquet" if parquet else ".enriched.csv")
+    argv = ["extract.py", path, "--output", output, "--grouped", path + ".grouped.csv"]
+    argv += ["--chunksize", str(chunksize)] + (["--parquet"] if parquet else [])
+    code = (
+        f"import resource, runpy, sys; sys.argv = {argv!r}; runpy.run_path('extract.py', run_name='__main__'); "
+        "print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)"
+    )
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    peak = int(result.stdout.split()[-1]) / 1024
+    return elapsed, peak, os.path.getsize(output) / 1e6
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", PORT), MockFigi)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    os.environ["OPENFIGI_URL"] = f"http://127.0.0.1:{PORT}/v3/mapping"
+    os.environ.setdefault("OPENFIGI_APIKEY", "mock")
+    os.environ["REFCACHE_PATH"] = os.path.join(tempfile.mkdtemp(), "refcache.sqlite3")
+    import extract
+
+    isins = [f"XX{i:010d}" for i in range(UNIVERSE)]
+    start = time.perf_counter()
+    resolved = extract.get_company_names_from_isins(isins)
+    elapsed = time.perf_counter() - start
+
+    print(f"resolved {len(resolved)}/{UNIVERSE} ISINs in {elapsed:.1f}s")
+    print(f"{MockFigi.requests_served} mapping requests, {MockFigi.rate_limited} rate limited")
+    print(f"one request per ISIN, serially, would take at least {UNIVERSE * LATENCY:.0f}s")
+
+    start = time.perf_counter()
+    extract.get_company_names_from_isins(isins)
+    print(f"warm cache: {time.perf_counter() - start:.2f}s")
+
+    path = os.path.join(tempfile.mkdtemp(), "trades.csv")
+    write_trades(path, args.rows)
+    print(f"{args.rows} trades, {os.path.getsize(path) / 1e6:.0f} MB of CSV")
+    print(f"{'run':>22} {'seconds':>8} {'rows/s':>9} {'peak MB':>8} {'out MB':>7}")
+    for name, chunksize, parquet in (
+        ("whole file, CSV", args.rows, False),
+        ("chunked, CSV", extract.CHUNK_ROWS, False),
+        ("chunked, Parquet", extract.CHUNK_ROWS, True),
+    ):
+        elapsed, peak, size = enrich_run(path, chunksize, parquet)
+        print(f"{name:>22} {elapsed:>8.1f} {args.rows / elapsed:>9.0f} {peak:>8.0f} {size:>7.0f}")
+    server.shutdown()
@@ -1,83 +1,256 @@
+import argparse
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import requests
 import pandas as pd
 
+# Shared reference data cache lives with the web app
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "WebApp"))
+from refcache import DAY, get_cache
+
 # Define the OpenFIGI API URL
-url = "https://api.openfigi.com/v3/mapping"
+url = os.environ.get("OPENFIGI_URL", "https://api.openfigi.com/v3/mapping")
 
 # Define the header with your OpenFIGI API key
 headers = {
     'Content-Type': 'application/json',
-    'X-OPENFIGI-APIKEY': ''  # Replace with your actual OpenFIGI API key
+    'X-OPENFIGI-APIKEY': os.environ.get("OPENFIGI_APIKEY", "")  # Replace with your actual OpenFIGI API key
 }
 
-# Function to get company name from ISIN using OpenFIGI API
-def get_company_name_from_isin(isin):
-    # Define the payload with the ISIN value
-    payload = [
-        {
-            "idType": "ID_ISIN",
-            "idValue": isin
-        }
-    ]
-    
+# OpenFIGI accepts up to 100 mapping jobs per request with an API key, 10 without
+BATCH_SIZE = 100 if headers['X-OPENFIGI-APIKEY'] else 10
+MAX_CONCURRENT_BATCHES = 4
+MAX_RETRIES = 6
+MAX_BACKOFF = 60
+# Rate limited answers only mean waiting and do not use up MAX_RETRIES; a
+# batch still rate limited after this many seconds fails
+RATE_LIMIT_PATIENCE = 600
+
+# ISIN -> company names rarely change; unknown ISINs are retried sooner
+ISIN_TTL = 30 * DAY
+ISIN_MISS_TTL = DAY
+
+# One pooled session shared by all batch workers
+session = requests.Session()
+adapter = requests.adapters.HTTPAdapter(pool_maxsize=MAX_CONCURRENT_BATCHES)
+session.mount("https://", adapter)
+session.mount("http://", adapter)
+
+class MappingError(RuntimeError):
+    pass
+
+
+# When any worker is rate limited, every worker waits until this time
+backoff_lock = threading.Lock()
+backoff_until = 0.0
+
+
+def wait_for_backoff():
+    delay = backoff_until - time.monotonic()
+    if delay > 0:
+        time.sleep(delay)
+
+
+def back_off(response, attempt):
+    global backoff_until
+    delay = min(2 ** attempt, MAX_BACKOFF)
+    if response is not None:
+        # OpenFIGI sends the seconds until the limit resets in ratelimit-reset
+        for header in ("Retry-After", "ratelimit-reset"):
+            try:
+                delay = float(response.headers[header])
+                break
+            except (KeyError, ValueError):
+                pass
+    with backoff_lock:
+        backoff_until = max(backoff_until, time.monotonic() + delay)
+
+
+# Resolve one batch of ISINs in a single mapping request. ISINs OpenFIGI has
+# no name for map to None; a batch that cannot be resolved raises
+# MappingError.
+def resolve_batch(isins):
+    payload = [{"idType": "ID_ISIN", "idValue": isin} for isin in isins]
+    deadline = time.monotonic() + RATE_LIMIT_PATIENCE
+
+    attempt = 0
+    while True:
+        wait_for_backoff()
+        try:
+            response = session.post(url, json=payload, headers=headers, timeout=30)
+        except requests.exceptions.RequestException as e:
+            response, error = None, e
+        else:
+            if response.status_code == 429:
+                if time.monotonic() > deadline:
+                    raise MappingError(
+                        f"Batch starting at ISIN {isins[0]} still rate limited after {RATE_LIMIT_PATIENCE}s"
+                    )
+                print("OpenFIGI rate limit reached, backing off")
+                back_off(response, attempt)
+                continue
+            if response.status_code < 500:
+                break
+            error = f"OpenFIGI returned {response.status_code}"
+
+        attempt += 1
+        if attempt >= MAX_RETRIES:
+            raise MappingError(f"Giving up on batch starting at ISIN {isins[0]} after {MAX_RETRIES} attempts: {error}")
+        print(f"Request failed for batch starting at ISIN {isins[0]}, error: {error}")
+        back_off(response, attempt)
+
     try:
-        # Make the POST request to the OpenFIGI API with an increased timeout
-        response = requests.post(url, json=payload, headers=headers, timeout=30)  # Timeout set to 30 seconds
-        response.raise_for_status()  # Raise an exception for HTTP error codes
-
-        # Print the raw response for debugging
-        print(f"API Response for ISIN {isin}: {response.text}")
-        
-        # Process the JSON response
-        data = response.json()
-        
-        # Check if the response contains valid data and extract the company name
-        if data and 'data' in data[0] and 'name' in data[0]['data'][0]:
-            return data[0]['data'][0]['name']
+        response.raise_for_status()
+    except requests.exceptions.RequestException as e:
+        raise MappingError(f"Request failed for batch starting at ISIN {isins[0]}, error: {e}")
+
+    # Jobs come back in request order
+    isin_to_company = {}
+    for isin, job in zip(isins, response.json()):
+        data = job.get("data")
+        if data and 'name' in data[0]:
+            isin_to_company[isin] = data[0]['name']
         else:
             print(f"No company name found for ISIN: {isin}")
-            return None
+            isin_to_company[isin] = None
+    return isin_to_company
 
-    except requests.exceptions.Timeout:
-        print(f"Request timed out for ISIN: {isin}")
-        return None
-    except requests.exceptions.RequestException as e:
-        print(f"Request failed for ISIN: {isin}, error: {e}")
-        return None
 
+# Resolve many ISINs: deduplicate, serve what the reference cache knows, and
+# chunk the rest into full mapping requests run a bounded number at a time.
+# Every batch that succeeds is cached before a failed one raises
+# MappingError, so a rerun only asks for the ISINs still missing.
+def get_company_names_from_isins(isins):
+    cache = get_cache()
+    unique = list(dict.fromkeys(isins))
+    isin_to_company = cache.get_many("isin", unique)
+    pending = [isin for isin in unique if isin not in isin_to_company]
+    batches = [pending[i:i + BATCH_SIZE] for i in range(0, len(pending), BATCH_SIZE)]
+
+    failed = 0
+    with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_BATCHES) as pool:
+        for future in [pool.submit(resolve_batch, batch) for batch in batches]:
+            try:
+                result = future.result()
+            except MappingError as e:
+                print(e)
+                failed += 1
+                continue
+            cache.put_many("isin", {k: v for k, v in result.items() if v is not None}, ISIN_TTL)
+            cache.put_many("isin", {k: v for k, v in result.items() if v is None}, ISIN_MISS_TTL)
+            isin_to_company.update(result)
+    if failed:
+        raise MappingError(f"{failed} of {len(batches)} OpenFIGI batches failed")
 
-# Load your trading data (assuming it's saved in trading_sample_data.csv)
-df = pd.read_csv(r'C:\Users\ararm\Desktop\CDTM\voice-trading-bot\data\trading_sample_data.csv')
+    # Only store if the company name is found
+    return {isin: name for isin, name in isin_to_company.items() if name is not None}
+
+
+# Function to get company name from ISIN using OpenFIGI API
+def get_company_name_from_isin(isin):
+    return get_company_names_from_isins([isin]).get(isin)
 
-# Get the unique ISINs from the DataFrame
-isin_list = df['ISIN'].unique()
 
-# Create a dictionary to store ISIN to company name mapping
-isin_to_company = {}
+# Enrichment runs in chunks of this many rows, so memory stays bounded by the
+# chunk size and the ISIN lookup whatever the size of the input
+CHUNK_ROWS = 200_000
+
+
+# Column kinds from the start of the file. Text columns are read as strings
+# in every chunk, and the Parquet schema is fixed up front so every row group
+# matches it.
+def column_types(input_file):
+    sample = pd.read_csv(input_file, nrows=1000)
+    # Numbers are read as float64 in every chunk: a column that holds whole
+    # numbers in the sample may hold fractions further down, and the Parquet
+    # schema fixed here must still fit it
+    return {
+        column: "float64" if pd.api.types.is_numeric_dtype(sample[column]) else "object"
+        for column in sample.columns
+    }
+
+
+# Stream the trades through the ISIN -> name lookup: each chunk resolves only
+# ISINs not seen before, gets its names with one vectorized merge, is
+# appended to the output (CSV, or Parquet row groups) and adds to the
+# per-company counts, so the input is read once.
+def enrich(input_file, output_file, grouped_file, chunksize=CHUNK_ROWS, parquet=False):
+    types = column_types(input_file)
+    # Names already in the input are replaced by the looked-up ones
+    columns = [column for column in types if column != "CompanyName"] + ["CompanyName"]
+    lookup = pd.DataFrame({"ISIN": pd.Series(dtype="object"), "CompanyName": pd.Series(dtype="object")})
+    seen = set()
+    counts = pd.Series(dtype="int64")
+    rows = 0
+
+    if parquet:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        kinds = {"float64": pa.float64(), "object": pa.string()}
+        fields = [(column, kinds[types[column]]) for column in columns[:-1]]
+        schema = pa.schema(fields + [("CompanyName", pa.string())])
+
+    # Written under a temporary name, so a failed run leaves no partial output
+    temp = f"{output_file}.{os.getpid()}.tmp"
+    writer = None
+    try:
+        with open(temp, "wb") as out:
+            try:
+                # Header or schema first, so an input without rows still
+                # gives a valid, empty output
+                if parquet:
+                    writer = pq.ParquetWriter(out, schema)
+                else:
+                    pd.DataFrame(columns=columns).to_csv(out, index=False)
+                for chunk in pd.read_csv(input_file, chunksize=chunksize, dtype=types):
+                    unseen = [isin for isin in chunk["ISIN"].dropna().unique() if isin not in seen]
+                    if unseen:
+                        seen.update(unseen)
+                        found = get_company_names_from_isins(unseen)
+                        lookup = pd.concat(
+                            [lookup, pd.DataFrame({"ISIN": list(found), "CompanyName": list(found.values())})],
+                            ignore_index=True,
+                        )
 
-# Loop through ISINs and get the company name
-for isin in isin_list:
-    if isin not in isin_to_company:
-        company_name = get_company_name_from_isin(isin)
-        if company_name:  # Only store if the company name is found
-            isin_to_company[isin] = company_name
+                    chunk = chunk.drop(columns="CompanyName", errors="ignore").merge(lookup, on="ISIN", how="left")
+                    if parquet:
+                        writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+                    else:
+                        chunk.to_csv(out, header=False, index=False)
 
-# Map company names back to the original DataFrame
-df['CompanyName'] = df['ISIN'].map(isin_to_company)
+                    counts = counts.add(chunk.groupby("CompanyName")["ISIN"].count(), fill_value=0)
+                    rows += len(chunk)
+                    print(f"Enriched {rows} rows, {len(seen)} distinct ISINs so far")
+            finally:
+                if writer is not None:
+                    writer.close()
+    except BaseException:
+        os.remove(temp)
+        raise
+    os.replace(temp, output_file)
 
-# Save the DataFrame to a CSV file
-output_file = r'C:\Users\ararm\Desktop\CDTM\voice-trading-bot\data\trading_sample_data_with_company.csv'
-df.to_csv(output_file, index=False)
+    grouped = counts.astype("int64").sort_index().rename_axis("CompanyName").rename("ISIN").reset_index()
+    grouped.to_csv(grouped_file, index=False)
+    return rows
 
-# Show message to indicate the file is saved
-print(f"Data with company names has been saved to: {output_file}")
 
-# Optionally, group by Company Name to see how many times each company appears
-grouped = df.groupby('CompanyName')['ISIN'].count().reset_index()
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("input", nargs="?", default=r'C:\Users\ararm\Desktop\CDTM\voice-trading-bot\data\trading_sample_data.csv')
+    parser.add_argument("--output", default=r'C:\Users\ararm\Desktop\CDTM\voice-trading-bot\data\trading_sample_data_with_company.csv')
+    parser.add_argument("--grouped", default=r'C:\Users\ararm\Desktop\CDTM\voice-trading-bot\data\grouped_by_company.csv')
+    parser.add_argument("--parquet", action="store_true", help="write the enriched rows as Parquet")
+    parser.add_argument("--chunksize", type=int, default=CHUNK_ROWS)
+    args = parser.parse_args()
 
-# Save the grouped data to another CSV file
-grouped_file = r'C:\Users\ararm\Desktop\CDTM\voice-trading-bot\data\grouped_by_company.csv'
-grouped.to_csv(grouped_file, index=False)
+    # Add company names to every trade and count trades per company
+    rows = enrich(args.input, args.output, args.grouped, args.chunksize, args.parquet)
 
-# Show message to indicate the grouped data is saved
-print(f"Grouped data has been saved to: {grouped_file}")
+    # Show message to indicate the files are saved
+    print(f"Data with company names for {rows} trades has been saved to: {args.output}")
+    print(f"Grouped data has been saved to: {args.grouped}")
@@ -1,4 +1,5 @@
 import os
+import sys
 import requests
 import speech_recognition as sr
 import pyttsx3
@@ -6,9 +7,13 @@ import pandas as pd
 import spacy
 import time
 
+# The ticker lookup and its reference data cache live with the web app
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "WebApp"))
+from tickers import ALPHA_VANTAGE_API_KEY, get_ticker_from_alphavantage
+from stt import STT_BACKEND, get_transcriber
+
 # Configuration
 CSV_FILE = r"C:\Users\ararm\Desktop\CDTM\voice-trading-bot\data\trading_sample_data_with_company.csv"
-ALPHA_VANTAGE_API_KEY = ""
 recognizer = sr.Recognizer()
 engine = pyttsx3.init()
 
@@ -16,40 +21,6 @@ engine = pyttsx3.init()
 df = pd.read_csv(CSV_FILE)
 nlp = spacy.load("en_core_web_sm")
 
-# Function to search for ticker symbol using Alpha Vantage's SYMBOL_SEARCH API
-# Function to search for ticker symbol using Alpha Vantage's SYMBOL_SEARCH API
-def get_ticker_from_alphavantage(company_name):
-    try:
-        url = f'https://www.alphavantage.co/query?function=SYMBOL_SEARCH&keywords={company_name}&apikey={ALPHA_VANTAGE_API_KEY}'
-        response = requests.get(url)
-        data = response.json()
-
-        # Log the full response to debug and understand what is being returned
-        print(f"Full response for {company_name}: {data}")
-
-        if "bestMatches" in data:
-            # Iterate through the best matches to find the correct symbol
-            for match in data["bestMatches"]:
-                ticker = match.get('1. symbol')
-                company = match.get('2. name')
-                exchange = match.get('4. region', '').lower()
-
-                # Check if the region is the US and select the first US match
-                if 'united states' in exchange:
-                    print(f"Ticker symbol found: {ticker} for company: {company} on exchange: {exchange}")
-                    return ticker
-
-            # If no valid ticker is found in the US region, log and return None
-            print(f"Error: No valid ticker symbol found for {company_name} in the US region.")
-            return None
-        else:
-            print(f"Error: Could not retrieve ticker for {company_name}")
-            return None
-    except Exception as e:
-        print(f"Error fetching ticker symbol from Alpha Vantage: {e}")
-        return None
-
-
 # Speak function
 def text_to_voice(text):
     print(text)
@@ -65,7 +36,10 @@ def voice_to_text():
 
     try:
         print("Recognizing command...")
-        text = recognizer.recognize_google(audio).lower()
+        if STT_BACKEND == "local":
+            text = get_transcriber(None).transcribe(audio.get_wav_data(), "command.wav").lower()
+        else:
+            text = recognizer.recognize_google(audio).lower()
         print(f"User said: {text}")
         return text
     except sr.UnknownValueError:
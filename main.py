@@ -1,4 +1,5 @@
 import os
+import sys
 import speech_recognition as sr
 from langchain.chains import LLMChain
 from langchain.prompts import PromptTemplate
@@ -9,6 +10,10 @@ import json
 import sounddevice as sd
 import openai
 
+# STT backends live with the web app
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "WebApp"))
+from stt import get_transcriber
+
 # Configuration
 OPENAI_API_KEY = ""
 ELEVEN_LABS_KEY = ""
@@ -27,23 +32,9 @@ def voice_to_text():
         audio = recognizer.listen(source)
     
     try:
-        # Save audio to a temporary file
-        temp_filename = "temp_audio.wav"
-        with open(temp_filename, "wb") as f:
-            f.write(audio.get_wav_data())
-
-        # Use OpenAI Whisper API for transcription
-        with open(temp_filename, "rb") as audio_file:
-            response = openai.audio.transcriptions.create(
-                model="whisper-1",
-                file=audio_file
-            )
-        
-        text = response.text
+        # Whisper API or the local model, depending on STT_BACKEND
+        text = get_transcriber(openai).transcribe(audio.get_wav_data(), "temp_audio.wav")
         print(f"User said: {text}")
-
-        # Optionally, delete the temp file
-        os.remove(temp_filename)
         return text
     except Exception as e:
         print(f"Error in speech recognition: {e}")
@@ -1,5 +1,5 @@
 import os
-import re
+import sys
 import requests
 import speech_recognition as sr
 import pyttsx3
@@ -9,9 +9,14 @@ import spacy
 from fuzzywuzzy import process
 from playsound import playsound
 
+# The ticker lookup and its reference data cache live with the web app
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "WebApp"))
+from tickers import ALPHA_VANTAGE_API_KEY, get_ticker_from_alphavantage
+from stt import get_transcriber
+from intents import detect_intent
+
 # Configuration
 CSV_FILE = r"C:\Users\ararm\Desktop\CDTM\voice-trading-bot\data\trading_sample_data_with_company.csv"
-ALPHA_VANTAGE_API_KEY = ""
 openai_client = OpenAI(
     api_key=""
 )
@@ -22,42 +27,8 @@ engine = pyttsx3.init()
 df = pd.read_csv(CSV_FILE)
 nlp = spacy.load("en_core_web_sm")
 
-
-# Function to search for ticker symbol using Alpha Vantage's SYMBOL_SEARCH API
-def get_ticker_from_alphavantage(company_name):
-    try:
-        url = f"https://www.alphavantage.co/query?function=SYMBOL_SEARCH&keywords={company_name}&apikey={ALPHA_VANTAGE_API_KEY}"
-        response = requests.get(url)
-        data = response.json()
-
-        # Log the full response for debugging
-        print(f"Full response for {company_name}: {data}")
-
-        if "bestMatches" in data:
-            # Iterate through the best matches to find the correct symbol
-            for match in data["bestMatches"]:
-                ticker = match.get("1. symbol")
-                company = match.get("2. name")
-                exchange = match.get("4. region", "").lower()
-
-                # Check if the region is the US and select the first US match
-                if "united states" in exchange:
-                    print(
-                        f"Ticker symbol found: {ticker} for company: {company} on exchange: {exchange}"
-                    )
-                    return ticker
-
-            # If no valid ticker is found in the US region, log and return None
-            print(
-                f"Error: No valid ticker symbol found for {company_name} in the US region."
-            )
-            return None
-        else:
-            print(f"Error: Could not retrieve ticker for {company_name}")
-            return None
-    except Exception as e:
-        print(f"Error fetching ticker symbol from Alpha Vantage: {e}")
-        return None
+# Distinct lowercased company names, the candidate set for fuzzy matching
+company_vocabulary = df["CompanyName"].dropna().str.lower().unique().tolist()
 
 
 # Get real-time stock price from Alpha Vantage
@@ -106,12 +77,10 @@ def text_to_voice(text):
 
 
 def audio_file_to_text(path):
-    # Transcribe using OpenAI Whisper
+    # Transcribe with the configured STT backend (Whisper API or local model)
     with open(path, "rb") as f:
-        transcript = openai_client.audio.transcriptions.create(
-            model="whisper-1", file=f
-        ).text
-    return transcript
+        audio = f.read()
+    return get_transcriber(openai_client).transcribe(audio, os.path.basename(path))
 
 
 # Speech recognition function
@@ -146,7 +115,7 @@ def extract_entities(command):
 
             # Fuzzy match the extracted name to the CSV file
             best_match = process.extractOne(
-                company_name, df["CompanyName"].str.lower().tolist()
+                company_name, company_vocabulary
             )
             if best_match and best_match[1] > 80:  # Match threshold can be adjusted
                 matched_company = best_match[0]
@@ -156,7 +125,7 @@ def extract_entities(command):
     # If no company was detected by spaCy, fallback to direct fuzzy matching
     company_name = command.lower()
     best_match = process.extractOne(
-        company_name, df["CompanyName"].str.lower().tolist()
+        company_name, company_vocabulary
     )
     if best_match and best_match[1] > 80:  # Match threshold can be adjusted
         matched_company = best_match[0]
@@ -173,74 +142,6 @@ def extract_entities(command):
     return ""
 
 
-SYNONYMS = {
-    "price": ["price", "cost", "worth", "value"],
-    "stock": ["stock", "share"],
-    "transaction": ["transaction", "txn", "deal", "operation"],
-    "company": ["company", "business", "firm"],
-    "list": ["list", "show", "display"],
-    "average": ["average", "mean"],
-    "total": ["total", "sum"],
-    "exit": ["exit", "stop", "quit", "leave"],
-    "help": ["help", "assist", "support"],
-}
-
-
-def expand_pattern(pattern):
-    expanded = []
-    for word in pattern:
-        expanded.append(SYNONYMS.get(word, [word]))
-    return expanded
-
-
-# Patterns use keywords, not synonyms directly
-INTENT_PATTERNS = {
-    "stock_price": [
-        ["stock", "price"],
-        ["how", "much", "stock", "cost"],
-        ["how", "much", "is", "stock"],
-        ["how", "much", "is", "the", "stock"],
-    ],
-    "top_company": [["most", "transactions"], ["top", "company"]],
-    "last_transaction": [["last", "transaction"]],
-    "first_transaction": [["first", "transaction"]],
-    "transaction_count": [["how", "many"], ["number", "transactions"]],
-    "total_value": [["total", "value"], ["total", "worth"]],
-    "average_value": [["average", "value"], ["average", "transaction"]],
-    "list_companies": [["list", "companies"], ["show", "companies"]],
-    "transaction_types": [["transaction", "types"], ["types", "of", "transactions"]],
-    "help": [["help"], ["what", "can", "you", "do"]],
-    "exit": [["stop"], ["exit"], ["enough"]],
-}
-
-
-def preprocess_command(command):
-    command = command.lower()
-    command = re.sub(r"[^\w\s]", "", command)
-    return command.split()
-
-
-# Intent detection - combine both systems
-def match_pattern(command_words, pattern):
-    # Expand pattern with synonyms
-    expanded = expand_pattern(pattern)
-    for synonym_group in expanded:
-        if not any(word in command_words for word in synonym_group):
-            return False
-    return True
-
-
-def detect_intent(command):
-    command_words = preprocess_command(command)
-
-    for intent, patterns in INTENT_PATTERNS.items():
-        for pattern in patterns:
-            if match_pattern(command_words, pattern):
-                return intent
-
-    return "unknown"
-
-
 # Transaction data functions
 def get_transaction_count(company):
     filtered = df[df["CompanyName"].str.lower().str.contains(company.lower(), na=False)]
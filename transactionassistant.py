@@ -1,10 +1,15 @@
 import os
+import sys
 import speech_recognition as sr
 import pyttsx3
 import pandas as pd
 import spacy
 from fuzzywuzzy import process
 
+# STT backends live with the web app
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "WebApp"))
+from stt import STT_BACKEND, get_transcriber
+
 # Configuration
 CSV_FILE = r"C:\Users\ararm\Desktop\CDTM\voice-trading-bot\data\trading_sample_data_with_company.csv"
 recognizer = sr.Recognizer()
@@ -36,7 +41,10 @@ def voice_to_text():
 
     try:
         print("Recognizing command...")
-        text = recognizer.recognize_google(audio).lower()
+        if STT_BACKEND == "local":
+            text = get_transcriber(None).transcribe(audio.get_wav_data(), "command.wav").lower()
+        else:
+            text = recognizer.recognize_google(audio).lower()
         print(f"User said: {text}")
         return text
     except sr.UnknownValueError: